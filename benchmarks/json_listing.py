@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Compare reading a large layers listing as XML, with ElementTree, and as
+JSON, through geoserver.jsondom: the time to parse the response and list
+the layer names, and the memory the parsed document holds on to.
+
+Memory is measured as the growth in resident set size across the parse,
+in a fresh interpreter that builds the body itself, so that no memory freed
+by earlier runs can be reused; it is only reported on systems with /proc
+(Linux).
+
+Run from the repository root:  python benchmarks/json_listing.py [layers]
+"""
+
+import subprocess
+import sys
+import timeit
+from xml.etree.ElementTree import XML
+from geoserver import jsondom
+
+REST = "http://localhost:8080/geoserver/rest"
+
+def layers_xml(count):
+    return "<layers>%s</layers>" % "".join(
+        "<layer><name>layer_%d</name><atom:link "
+        "xmlns:atom=\"http://www.w3.org/2005/Atom\" rel=\"alternate\" "
+        "href=\"%s/layers/layer_%d.xml\" "
+        "type=\"application/xml\"/></layer>" % (i, REST, i) for i in range(count))
+
+def layers_json(count):
+    return '{"layers": {"layer": [%s]}}' % ",".join(
+        '{"name": "layer_%d", "href": "%s/layers/layer_%d.json"}' % (i, REST, i)
+        for i in range(count))
+
+def names(dom):
+    return [l.find("name").text for l in dom.findall("layer")]
+
+def rss():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except IOError:
+        return None
+
+FORMATS = {
+    "XML": (XML, layers_xml),
+    "JSON": (jsondom.parse, layers_json)
+}
+
+def _measure(label, count):
+    # runs in a fresh interpreter, see held_memory
+    parse, build = FORMATS[label]
+    body = build(count)
+    before = rss()
+    dom = parse(body)
+    after = rss()
+    print "n/a" if before is None else after - before
+
+def held_memory(label, count):
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--measure", label, str(count)]).strip()
+    return None if output == "n/a" else int(output)
+
+def main(count=100000, repeat=3):
+    print "layers listing with %d layers" % count
+    for label in ["XML", "JSON"]:
+        parse, build = FORMATS[label]
+        body = build(count)
+        parse_time = min(timeit.repeat(lambda: parse(body), number=1, repeat=repeat))
+        list_time = min(timeit.repeat(lambda: names(parse(body)), number=1, repeat=repeat))
+        held = held_memory(label, count)
+        print "  %-4s %9d bytes  parse %7.1f ms  parse and list %7.1f ms  holds %s" % (
+            label, len(body), 1000 * parse_time, 1000 * list_time,
+            "n/a" if held is None else "%.1f MB" % (held / 1048576.0))
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--measure"]:
+        _measure(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""
+Time repeated reads of a large listing from the catalog cache, against
+parsing the same response body on every read as gsconfig used to.
+
+The listing is served by the stand-in GeoServer of the test suite, so the
+repository root must be on the path as well as gsconfig.  Run from the
+repository root:  PYTHONPATH=src:. python benchmarks/parsed_cache.py [layers]
+"""
+
+import sys
+import timeit
+from xml.etree.ElementTree import XML
+from geoserver.catalog import Catalog
+from test.standin import StandInGeoServer
+
+def layers_xml(count):
+    return "<layers>%s</layers>" % "".join(
+        "<layer><name>layer_%d</name><atom:link "
+        "xmlns:atom=\"http://www.w3.org/2005/Atom\" rel=\"alternate\" "
+        "href=\"http://localhost:8080/geoserver/rest/layers/layer_%d.xml\" "
+        "type=\"application/xml\"/></layer>" % (i, i) for i in range(count))
+
+def main(count=10000, reads=20):
+    body = layers_xml(count)
+    server = StandInGeoServer({"/geoserver/rest/layers.xml": body}).start()
+    try:
+        cat = Catalog(server.rest_url)
+        layers_url = server.rest_url + "/layers.xml"
+        cat.get_xml(layers_url)
+
+        reparse = min(timeit.repeat(lambda: XML(body), number=reads, repeat=3))
+        cached = min(timeit.repeat(lambda: cat.get_xml(layers_url), number=reads, repeat=3))
+    finally:
+        server.stop()
+
+    print "layers.xml with %d layers (%d bytes), %d cache hits" % (count, len(body), reads)
+    print "  parse on every hit: %8.2f ms per hit" % (1000 * reparse / reads)
+    print "  cached tree:        %8.4f ms per hit" % (1000 * cached / reads)
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Measure the memory each object of a large listing takes as a full catalog
+object (Layer, FeatureType, Style) and as a summary (LayerSummary,
+ResourceSummary, StyleSummary).  The names are built beforehand, so the
+figures are the per-object overhead alone.
+
+Memory is measured as the growth in resident set size of a fresh process,
+so it is only reported on systems with /proc (Linux).
+
+Run from the repository root:  python benchmarks/summary_memory.py [objects]
+"""
+
+import sys
+from multiprocessing import Process, Queue
+from geoserver.catalog import Catalog
+from geoserver.layer import Layer
+from geoserver.resource import FeatureType
+from geoserver.store import DataStore
+from geoserver.style import Style
+from geoserver.summary import LayerSummary, ResourceSummary, StyleSummary
+from geoserver.workspace import Workspace
+
+def rss():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except IOError:
+        return None
+
+def _measure(build, count, results):
+    names = ["layer_%d" % i for i in range(count)]
+    before = rss()
+    objects = [build(name) for name in names]
+    after = rss()
+    results.put(None if before is None else (after - before) / float(count))
+    del objects
+
+def per_object(build, count):
+    results = Queue()
+    child = Process(target=_measure, args=(build, count, results))
+    child.start()
+    size = results.get()
+    child.join()
+    return size
+
+def main(count=100000):
+    cat = Catalog("http://localhost:8080/geoserver/rest")
+    workspace = Workspace(cat, "topp")
+    store = DataStore(cat, workspace, "states_shapefile")
+    kinds = [
+        ("layer", lambda name: Layer(cat, name),
+            lambda name: LayerSummary(cat, name)),
+        ("feature type", lambda name: FeatureType(cat, workspace, store, name),
+            lambda name: ResourceSummary(cat, workspace, store, name)),
+        ("style", lambda name: Style(cat, name),
+            lambda name: StyleSummary(cat, name)),
+    ]
+    print "bytes per object, %d objects" % count
+    for label, full, summary in kinds:
+        sizes = [per_object(build, count) for build in (full, summary)]
+        if None in sizes:
+            print "  %-13s n/a" % label
+        else:
+            print "  %-13s full %6.0f  summary %6.0f" % (label, sizes[0], sizes[1])
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,106 @@
+from multiprocessing.pool import ThreadPool
+from geoserver.catalog import Catalog
+
+class AsyncCatalog(object):
+    """
+    A non-blocking front end for a Catalog.
+
+    Each method takes the same arguments as the Catalog method of the same
+    name, but returns immediately with an AsyncResult (see
+    multiprocessing.pool) whose get() method returns the value or raises the
+    error of the underlying call.  The results are the usual model objects
+    (Workspace, DataStore, FeatureType, Layer, ...) bound to the wrapped
+    catalog.
+
+    Up to ``workers`` REST calls run at once, so the wrapped catalog's
+    pool_size should be at least as large.  Listings that span several
+    workspaces or stores are split into one request per workspace or store
+    and fanned out across the workers.
+    """
+
+    def __init__(self, catalog, workers=8):
+        if not isinstance(catalog, Catalog):
+            raise ValueError("AsyncCatalog wraps a Catalog, not %r" % catalog)
+        self.catalog = catalog
+        # Single REST calls run on _requests.  Fan-out calls run on _tasks
+        # and wait there for their parts, so they can never starve the
+        # workers that the parts need.
+        self._requests = ThreadPool(workers)
+        self._tasks = ThreadPool(workers)
+
+    def _call(self, method, *args, **kwargs):
+        return self._requests.apply_async(method, args, kwargs)
+
+    def _fan_out(self, method, *args, **kwargs):
+        return self._tasks.apply_async(method, args, kwargs)
+
+    def _map(self, func, items):
+        results = self._requests.map(func, items)
+        return [x for result in results for x in result]
+
+    def get_workspaces(self):
+        return self._call(self.catalog.get_workspaces)
+
+    def get_workspace(self, name):
+        return self._call(self.catalog.get_workspace, name)
+
+    def get_stores(self, workspace=None):
+        if workspace is not None:
+            return self._call(self.catalog.get_stores, workspace)
+        return self._fan_out(self._all_stores)
+
+    def _all_stores(self):
+        return self._map(self.catalog.get_stores, self.catalog.get_workspaces())
+
+    def get_store(self, name, workspace=None):
+        return self._call(self.catalog.get_store, name, workspace)
+
+    def get_resources(self, store=None, workspace=None):
+        if store is not None:
+            return self._call(self.catalog.get_resources, store, workspace)
+        return self._fan_out(self._all_resources, workspace)
+
+    def _all_resources(self, workspace):
+        if workspace is None:
+            stores = self._all_stores()
+        else:
+            stores = self.catalog.get_stores(workspace)
+        return self._map(lambda s: s.get_resources(), stores)
+
+    def get_resource(self, name, store=None, workspace=None):
+        return self._call(self.catalog.get_resource, name, store, workspace)
+
+    def get_layers(self, resource=None):
+        return self._call(self.catalog.get_layers, resource)
+
+    def get_layer(self, name):
+        return self._call(self.catalog.get_layer, name)
+
+    def get_layergroups(self):
+        return self._call(self.catalog.get_layergroups)
+
+    def get_styles(self, workspace=None):
+        return self._call(self.catalog.get_styles, workspace)
+
+    def save(self, obj):
+        return self._call(self.catalog.save, obj)
+
+    def delete(self, config_object, purge=False, recurse=False):
+        return self._call(self.catalog.delete, config_object, purge, recurse)
+
+    def create_featurestore(self, name, data, workspace=None, overwrite=False, charset=None, progress=None, external=False):
+        return self._call(self.catalog.create_featurestore,
+            name, data, workspace, overwrite, charset, progress, external)
+
+    def create_coveragestore(self, name, data, workspace=None, overwrite=False, progress=None, external=False):
+        return self._call(self.catalog.create_coveragestore,
+            name, data, workspace, overwrite, progress, external)
+
+    def close(self):
+        """
+        Stop accepting work and wait for outstanding calls to finish.
+        """
+        self._tasks.close()
+        self._requests.close()
+        self._tasks.join()
+        self._requests.join()
@@ -0,0 +1,219 @@
+from collections import OrderedDict
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("gsconfig.cache")
+
+class CacheEntry(object):
+    """
+    A REST response body kept by a CatalogCache, with the validators
+    (conditional request headers) needed to revalidate it once it expires.
+    The catalog keeps the parsed document in ``dom`` so that cache hits
+    skip parsing; it is shared by every reader and must not be modified.
+    """
+
+    def __init__(self, url, content, validators=None, fetched=None):
+        self.url = url
+        self.content = content
+        self.validators = validators or dict()
+        self.fetched = fetched if fetched is not None else time.time()
+        self.expires = self.fetched
+        self.dom = None
+
+    @property
+    def size(self):
+        return len(self.content)
+
+    def is_fresh(self):
+        return time.time() < self.expires
+
+class CatalogCache(object):
+    """
+    A bounded, thread-safe cache of REST responses, keyed by URL.
+
+    Entries stay fresh for ``ttl`` seconds, unless the URL matches one of
+    the regular expressions in ``ttls``, a sequence of (pattern, seconds)
+    pairs where the first match wins.  Stale entries are kept so that they
+    can be revalidated cheaply, but once the cache holds more than
+    ``max_entries`` responses or ``max_bytes`` bytes of them, the least
+    recently used entries are evicted.  Either limit may be None.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=None, ttl=5, ttls=()):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.ttls = [(re.compile(pattern), seconds) for pattern, seconds in ttls]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+    def ttl_for(self, url):
+        for pattern, seconds in self.ttls:
+            if pattern.search(url):
+                return seconds
+        return self.ttl
+
+    def get(self, url):
+        """
+        Return the entry for url, fresh or not, or None if there is none.
+        Only fresh entries count as hits.
+        """
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is None:
+                entry = self._load(url)
+                if entry is not None:
+                    entry.expires = entry.fetched + self.ttl_for(url)
+                    self._bytes += entry.size
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries[url] = entry
+            self._evict()
+            if entry.is_fresh():
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, entry):
+        with self._lock:
+            self._discard(entry.url)
+            entry.expires = entry.fetched + self.ttl_for(entry.url)
+            self._entries[entry.url] = entry
+            self._bytes += entry.size
+            self._evict()
+            self._store(entry)
+
+    def touch(self, entry, validators=None):
+        """
+        Mark entry fresh again after the server confirmed it is unchanged.
+        """
+        with self._lock:
+            self.revalidations += 1
+            entry.fetched = time.time()
+            entry.expires = entry.fetched + self.ttl_for(entry.url)
+            if validators:
+                entry.validators = validators
+            self._store(entry)
+
+    # Hooks for caches backed by a persistent store; called with the lock held
+
+    def _load(self, url):
+        """Return the stored entry for url, or None."""
+        return None
+
+    def _store(self, entry):
+        """Store entry, replacing any other entry for its URL."""
+        pass
+
+    def _delete(self, prefixes):
+        """Delete the stored entries whose URL starts with one of prefixes."""
+        pass
+
+    def _discard(self, url):
+        entry = self._entries.pop(url, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def _evict(self):
+        while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            url, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+            logger.debug("evicted %s", url)
+
+    def invalidate(self, prefixes):
+        """
+        Drop every entry whose URL starts with one of prefixes.
+        """
+        prefixes = tuple(prefixes)
+        with self._lock:
+            stale = [url for url in self._entries if url.startswith(prefixes)]
+            for url in stale:
+                self._discard(url)
+            self._delete(prefixes)
+            if stale:
+                logger.debug("invalidated %s", ", ".join(stale))
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._delete(("",))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, url):
+        return url in self._entries
+
+    def stats(self):
+        with self._lock:
+            return dict(hits=self.hits, misses=self.misses,
+                evictions=self.evictions, revalidations=self.revalidations,
+                entries=len(self._entries), bytes=self._bytes)
+
+class SQLiteCache(CatalogCache):
+    """
+    A CatalogCache that also keeps every response, with its validators and
+    fetch time, in an SQLite database file.  A new process that opens the
+    same file starts warm: entries still within their ttl are served
+    directly, and older ones are revalidated with a conditional request.
+    The in-memory limits still apply; the file holds at most one row per
+    URL.  Any number of threads and processes may share the file.
+    """
+
+    def __init__(self, path, **kwargs):
+        super(SQLiteCache, self).__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+        with self._db() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, content BLOB, validators TEXT, fetched REAL)")
+
+    def _db(self):
+        # sqlite3 connections can't be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            try:
+                # lets readers in other processes proceed during a write
+                db.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError, e:
+                logger.debug("could not enable WAL for %s: %s", self.path, e)
+            self._local.db = db
+        return db
+
+    def _load(self, url):
+        row = self._db().execute(
+            "SELECT content, validators, fetched FROM responses WHERE url = ?",
+            (url,)).fetchone()
+        if row is None:
+            return None
+        content, validators, fetched = row
+        return CacheEntry(url, str(content), json.loads(validators), fetched)
+
+    def _store(self, entry):
+        with self._db() as db:
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (entry.url, buffer(entry.content), json.dumps(entry.validators), entry.fetched))
+
+    def _delete(self, prefixes):
+        with self._db() as db:
+            for prefix in prefixes:
+                db.execute("DELETE FROM responses WHERE substr(url, 1, ?) = ?",
+                    (len(prefix), prefix))
@@ -1,21 +1,28 @@
-from datetime import datetime, timedelta
 import logging
+from geoserver.cache import CatalogCache, CacheEntry
 from geoserver.layer import Layer
 from geoserver.resource import FeatureType, Coverage
 from geoserver.store import coveragestore_from_index, datastore_from_index, \
-    UnsavedDataStore, UnsavedCoverageStore
-from geoserver.style import Style, Workspace_Style
-from geoserver.support import prepare_upload_bundle, url
+    DataStore, UnsavedDataStore, UnsavedCoverageStore
+from geoserver.style import Style, Workspace_Style, style_from_url
+from geoserver.support import spooled_upload_bundle, url
 from geoserver.layergroup import LayerGroup, UnsavedLayerGroup
 from geoserver.workspace import workspace_from_index, Workspace
-from os import unlink
-import httplib2
-import re
+from geoserver.transport import HttpPool, carry_deadline, within_deadline
+from geoserver.index import CatalogIndex
+from geoserver.summary import LayerSummary, ResourceSummary, StyleSummary
+from geoserver import jsondom
+from collections import namedtuple
+from functools import wraps
+from os.path import isdir, splitext
+from urlparse import parse_qs
+from StringIO import StringIO
+import urllib
+from multiprocessing.pool import ThreadPool
 from xml.etree.ElementTree import XML
+from xml.etree.cElementTree import iterparse
 from xml.parsers.expat import ExpatError
 
-from urlparse import urlparse
-
 logger = logging.getLogger("gsconfig.catalog")
 
 class UploadError(Exception):
@@ -30,6 +37,10 @@ class AmbiguousRequestError(Exception):
 class FailedRequestError(Exception):
     pass
 
+SaveResult = namedtuple("SaveResult", ["obj", "response", "error"])
+## The outcome of saving one object with Catalog.save_many: the (headers,
+## body) response, or None and the exception that made the save fail.
+
 def _name(named):
     """Get the name out of an object.  This varies based on the type of the input:
        * the "name" of a string is itself
@@ -45,6 +56,70 @@ def _name(named):
     else:
         raise ValueError("Can't interpret %s as a name or a configuration object" % named)
 
+def _json_url(rest_url):
+    """Ask for the JSON representation of a REST resource instead of the
+    XML one."""
+    path, sep, query = rest_url.partition("?")
+    if path.endswith(".xml"):
+        path = path[:-len(".xml")] + ".json"
+    return path + sep + query
+
+def _file_url(path):
+    """The body of an external upload: a file: URL for path, which must be
+    where GeoServer finds the data on its own filesystem."""
+    if path.startswith("file:"):
+        return path
+    return "file:" + urllib.pathname2url(path)
+
+def _external_shapefile(data):
+    if isinstance(data, dict):
+        data = data.get("shp")
+    if not isinstance(data, basestring):
+        raise ValueError("External publishing needs the path of a shapefile, not %r" % data)
+    return data
+
+_IMAGE_EXTENSIONS = ["tif", "tiff", "png", "jpg", "jpeg", "gif"]
+
+def _external_coverage(data):
+    """Return the path of the raster data and the format GeoServer should
+    read it as: a world image for a dict of files with a world file, an
+    image mosaic for a directory and a GeoTIFF otherwise."""
+    if isinstance(data, dict):
+        images = [data[ext] for ext in _IMAGE_EXTENSIONS if ext in data]
+        if not images or not isinstance(images[0], basestring):
+            raise ValueError("External publishing needs the path of an image, not %r" % data)
+        return images[0], "worldimage" if "tfw" in data else "geotiff"
+    if not isinstance(data, basestring):
+        raise ValueError("External publishing needs the path of a raster, not %r" % data)
+    if data.endswith("/") or isdir(data):
+        return data, "imagemosaic"
+    return data, "geotiff"
+
+def _validators(response):
+    """Build the conditional request headers for revalidating a response
+    whose body we keep, from its ETag and Last-Modified headers."""
+    headers = dict()
+    if 'etag' in response:
+        headers['If-None-Match'] = response['etag']
+    if 'last-modified' in response:
+        headers['If-Modified-Since'] = response['last-modified']
+    return headers
+
+def _deadline(method):
+    """
+    Give a catalog method a deadline= argument: the seconds that all the
+    requests it makes may take together before it raises DeadlineExceeded
+    (see geoserver.transport.within_deadline).
+    """
+    @wraps(method)
+    def limited(self, *args, **kwargs):
+        seconds = kwargs.pop("deadline", None)
+        if seconds is None:
+            return method(self, *args, **kwargs)
+        with within_deadline(seconds):
+            return method(self, *args, **kwargs)
+    return limited
+
 class Catalog(object):
     """
     The GeoServer catalog represents all of the information in the GeoServer
@@ -58,30 +133,92 @@ class Catalog(object):
     - Maps, which provide a set of OWS services with a subset of the server's
         Layers
     - Namespaces, which provide unique identifiers for resources
+
+    With wire_format="json", reads fetch GeoServer's JSON representations,
+    which are smaller and cheaper to parse than the XML ones, and present
+    them through the same element API (see geoserver.jsondom).  Writes are
+    always sent as XML.
+
+    ``retry`` and ``circuit_breaker`` take a RetryPolicy and a
+    CircuitBreaker from geoserver.transport, to ride out GeoServer restarts
+    and to stop waiting on one that is down, and ``timeout`` the seconds
+    any one request may hang; see HttpPool.  The get_* lookups and
+    listings, save, save_many, delete and build_index take a deadline=
+    argument, the seconds the whole call may take: requests it would still
+    make after that, including those fanned out to the workers, raise
+    geoserver.transport.DeadlineExceeded, and requests still running are
+    cut short.
+
+    Every REST request is reported to the ``listeners``, see
+    geoserver.metrics, and counted for stats().
     """
 
-    def __init__(self, service_url, username="admin", password="geoserver", disable_ssl_certificate_validation=False):
+    def __init__(self, service_url, username="admin", password="geoserver", disable_ssl_certificate_validation=False, pool_size=4, workers=None, cache=None, direct_lookups=False, compress_requests=False, wire_format="xml", retry=None, circuit_breaker=None, timeout=None, listeners=()):
+        if wire_format not in ("xml", "json"):
+            raise ValueError("wire_format must be 'xml' or 'json', not %r" % wire_format)
         self.service_url = service_url
         if self.service_url.endswith("/"):
             self.service_url = self.service_url.strip("/")
-        self.http = httplib2.Http(
-            disable_ssl_certificate_validation=disable_ssl_certificate_validation)
         self.username = username
         self.password = password
-        self.http.add_credentials(self.username, self.password)
-        netloc = urlparse(service_url).netloc
-        self.http.authorizations.append(
-                httplib2.BasicAuthentication(
-                        (username, password),
-                        netloc,
-                        service_url,
-                        {},
-                        None,
-                        None,
-                        self.http
-                        ))
-        self._cache = dict()
+        self.http = HttpPool(self.service_url, username, password, size=pool_size,
+            disable_ssl_certificate_validation=disable_ssl_certificate_validation,
+            compress_requests=compress_requests, retry=retry,
+            circuit_breaker=circuit_breaker, timeout=timeout, listeners=listeners)
+        self._cache = cache if cache is not None else CatalogCache()
         self._version = None
+        self.workers = workers
+        self.direct_lookups = direct_lookups
+        self.wire_format = wire_format
+        self._index = None
+
+    def stats(self):
+        """
+        Return what the catalog has done so far, as a dict of dicts:
+        "transport", the request, byte, retry and deadline counts of the
+        HTTP pool (see HttpPool.stats), "cache", the response cache's hits,
+        misses and size, and "endpoints", the requests, errors, bytes,
+        seconds and latency histogram of each REST endpoint (see
+        geoserver.metrics.RequestMetrics).
+        """
+        return dict(transport=self.http.stats(), cache=self._cache.stats(),
+            endpoints=self.http.metrics.stats())
+
+    @_deadline
+    def build_index(self):
+        """
+        Fetch the names of every workspace, store, resource, layer and
+        style into a CatalogIndex, and answer get_workspace, get_store,
+        get_resource, get_layer and get_style from it until drop_index() is
+        called.  Names missing from the index are still looked up over
+        REST.  Call again to refresh the index.
+        """
+        index = CatalogIndex(self).build()
+        self._index = index
+        return index
+
+    def drop_index(self):
+        self._index = None
+
+    def _map(self, func, items):
+        """
+        Apply func to each of items, returning the results in order.  With
+        workers set, the calls run concurrently on a pool of that many
+        threads, started for the call and stopped before it returns;
+        otherwise they run one after another.
+        """
+        items = list(items)
+        if not self.workers or self.workers < 2 or len(items) < 2:
+            return map(func, items)
+        pool = ThreadPool(min(self.workers, len(items)))
+        try:
+            return pool.map(carry_deadline(func), items)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _fan_out(self, func, items):
+        return [x for result in self._map(func, items) for x in result]
 
     def about(self):
         '''return the about information as a formatted html'''
@@ -122,6 +259,7 @@ class Catalog(object):
         self._version = version
         return version
 
+    @_deadline
     def delete(self, config_object, purge=False, recurse=False):
         """
         send a delete request
@@ -148,46 +286,158 @@ class Catalog(object):
             "Accept": "application/xml"
         }
         response, content = self.http.request(rest_url, "DELETE", headers=headers)
-        self._cache.clear()
+        if recurse:
+            # whatever lived below the object is gone too, wherever it was listed
+            self._invalidate_all()
+        else:
+            self._invalidate(config_object.href)
 
         if response.status == 200:
             return (response, content)
         else:
             raise FailedRequestError("Tried to make a DELETE request to %s but got a %d status code: \n%s" % (rest_url, response.status, content))
 
+    def _invalidate(self, *hrefs):
+        """
+        Drop the cached responses that a write to each of hrefs may have
+        changed: the object itself, everything below it, and the listing it
+        appears in.  An href of the form <collection>?name=<name> stands for
+        a new object being added to that collection.
+        """
+        prefixes = []
+        for href in hrefs:
+            path, _, query = href.partition("?")
+            name = parse_qs(query).get("name")
+            if name:
+                collection = path.rstrip("/")
+                base = url(collection, [name[0]])
+            else:
+                base = splitext(path)[0]
+                collection = base.rsplit("/", 1)[0]
+            prefixes.extend([base + ".", base + "/", collection + "."])
+            # workspaces and namespaces are two views of the same objects
+            for plural, twin in [("/workspaces", "/namespaces"), ("/namespaces", "/workspaces")]:
+                if collection.endswith(plural):
+                    twin_collection = collection[:-len(plural)] + twin
+                    twin_base = twin_collection + base[len(collection):]
+                    prefixes.extend([twin_base + ".", twin_base + "/", twin_collection + "."])
+        self._cache.invalidate(prefixes)
+        if self._index is not None:
+            self._index.forget(prefixes)
+
+    def _invalidate_all(self):
+        self._cache.clear()
+        if self._index is not None:
+            self._index.forget([""])
+
+    def _invalidate_upload(self, workspace, store_type, store):
+        """
+        Drop the cached responses that a file upload into a store may have
+        changed, including the layer listings the new layers appear in.
+        An upload to the "default" alias changes the listings of the
+        workspace it stands for, which are cached under its real name.
+        """
+        hrefs = [url(self.service_url, ["workspaces", workspace, store_type, store + ".xml"]),
+                 url(self.service_url, ["layers.xml"])]
+        if workspace == "default":
+            try:
+                default = self.get_default_workspace()
+                default.fetch()
+                real = default.dom.find("name").text
+            except FailedRequestError:
+                self._invalidate_all()
+                return
+            hrefs.append(url(self.service_url, ["workspaces", real, store_type, store + ".xml"]))
+        self._invalidate(*hrefs)
+
     def get_xml(self, rest_url):
+        """
+        GET rest_url and return the parsed document.  Parsed documents are
+        cached along with the response and shared between callers, so the
+        returned element must be treated as read-only.  If the catalog
+        reads JSON, an .xml rest_url is fetched as .json and the result is
+        a geoserver.jsondom.JSONElement; other documents are parsed as XML.
+        """
+        return self._get_xml(rest_url)
+
+    def _iter_xml(self, rest_url, tag):
+        """
+        GET the listing at rest_url and yield its <tag> children one at a
+        time as the response is parsed.  Each element is dropped from the
+        document once the consumer moves on to the next, so memory use does
+        not grow with the length of the listing.  Streamed listings always
+        come as XML and bypass the cache.
+        """
+        logger.debug("GET %s (streaming)", rest_url)
+        with self.http.stream(rest_url) as response:
+            if response.status != 200:
+                raise FailedRequestError("Tried to make a GET request to %s but got a %d status code: \n%s" % (rest_url, response.status, response.read()))
+            depth = 0
+            for event, node in iterparse(response, events=("start", "end")):
+                if event == "start":
+                    if depth == 0:
+                        root = node
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1 and node.tag == tag:
+                    yield node
+                    root.clear()
+
+    def _get_xml(self, rest_url, allow_missing=False):
+        # only catalog documents have a JSON representation; others, such
+        # as style bodies, are fetched and parsed as they are
+        as_json = (self.wire_format == "json" and
+            rest_url.partition("?")[0].endswith((".xml", ".json")))
+        if as_json:
+            rest_url = _json_url(rest_url)
         logger.debug("GET %s", rest_url)
 
         cached_response = self._cache.get(rest_url)
 
-        def is_valid(cached_response):
-            return cached_response is not None and datetime.now() - cached_response[0] < timedelta(seconds=5)
-
         def parse_or_raise(xml):
             try:
+                if as_json:
+                    return jsondom.parse(xml)
                 return XML(xml)
-            except (ExpatError, SyntaxError), e:
-                msg = "GeoServer gave non-XML response for [GET %s]: %s"
-                msg = msg % (rest_url, xml)
+            except (ExpatError, SyntaxError, ValueError), e:
+                msg = "GeoServer gave non-%s response for [GET %s]: %s"
+                msg = msg % ("JSON" if as_json else "XML", rest_url, xml)
                 raise Exception(msg, e)
 
-        if is_valid(cached_response):
-            raw_text = cached_response[1]
-            return parse_or_raise(raw_text)
+        def parsed(entry):
+            if entry.dom is None:
+                entry.dom = parse_or_raise(entry.content)
+            return entry.dom
+
+        if cached_response is not None and cached_response.is_fresh():
+            return parsed(cached_response)
+
+        # A stale entry may still be current on the server; if it carries
+        # validators, ask GeoServer to answer with a bodiless 304 in that case
+        headers = cached_response.validators if cached_response is not None else {}
+        response, content = self.http.request(rest_url, headers=headers)
+        if response.status == 304 and cached_response is not None:
+            logger.debug("%s not modified", rest_url)
+            self._cache.touch(cached_response, _validators(response))
+            return parsed(cached_response)
+        elif response.status == 200:
+            entry = CacheEntry(rest_url, content, _validators(response))
+            dom = parsed(entry)
+            self._cache.put(entry)
+            return dom
+        elif response.status == 404 and allow_missing:
+            return None
         else:
-            response, content = self.http.request(rest_url)
-            if response.status == 200:
-                self._cache[rest_url] = (datetime.now(), content)
-                return parse_or_raise(content)
-            else:
-                raise FailedRequestError("Tried to make a GET request to %s but got a %d status code: \n%s" % (rest_url, response.status, content))
+            raise FailedRequestError("Tried to make a GET request to %s but got a %d status code: \n%s" % (rest_url, response.status, content))
 
     def reload(self):
         reload_url = url(self.service_url, ['reload'])
         response = self.http.request(reload_url, "POST")
-        self._cache.clear()
+        self._invalidate_all()
         return response
 
+    @_deadline
     def save(self, obj):
         """
         saves an object to the REST service
@@ -195,6 +445,13 @@ class Catalog(object):
         gets the object's REST location and the XML from the object,
         then POSTS the request.
         """
+        try:
+            return self._save(obj)
+        finally:
+            self._invalidate(obj.href)
+
+    def _save(self, obj):
+        # the request alone; callers drop the cached responses it changes
         rest_url = obj.href
         message = obj.message()
 
@@ -205,12 +462,55 @@ class Catalog(object):
         logger.debug("%s %s", obj.save_method, obj.href)
         response = self.http.request(rest_url, obj.save_method, message, headers)
         headers, body = response
-        self._cache.clear()
         if 400 <= int(headers['status']) < 600:
             raise FailedRequestError("Error code (%s) from GeoServer: %s" %
                 (headers['status'], body))
         return response
 
+    @_deadline
+    def save_many(self, objs, max_workers=None):
+        """
+        Save each of objs, with up to max_workers requests in flight at
+        once (by default the catalog's workers, or the HTTP pool size).  A
+        failed save doesn't stop the others: the result is a list of
+        SaveResult(obj, response, error), one per object and in the same
+        order, where error is the exception the save raised, or None.
+        Cached responses are dropped once, after every save has finished.
+        """
+        objs = list(objs)
+        if max_workers is None:
+            max_workers = self.workers or self.http.size
+
+        @carry_deadline
+        def save_one(obj):
+            try:
+                return SaveResult(obj, self._save(obj), None)
+            except Exception, e:
+                logger.debug("saving %s failed: %s", obj.href, e)
+                return SaveResult(obj, None, e)
+
+        try:
+            if max_workers < 2 or len(objs) < 2:
+                return map(save_one, objs)
+            pool = ThreadPool(min(max_workers, len(objs)))
+            try:
+                return pool.map(save_one, objs)
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            self._invalidate(*[obj.href for obj in objs])
+
+    def session(self, max_workers=None):
+        """
+        Start a unit of work that saves the changes to the objects loaded
+        through it in one batch; see geoserver.session.Session.
+        """
+        # session builds on this module, so import it late
+        from geoserver.session import Session
+        return Session(self, max_workers)
+
+    @_deadline
     def get_store(self, name, workspace=None):
 
         # Make sure workspace is a workspace object and not a string.
@@ -218,6 +518,13 @@ class Catalog(object):
         if isinstance(workspace, basestring):
             workspace = self.get_workspace(workspace)
 
+        if self._index is not None:
+            indexed = self._index.stores(name, _name(workspace))
+            if len(indexed) == 1:
+                return indexed[0]
+            elif len(indexed) > 1:
+                raise AmbiguousRequestError("Multiple stores found named '%s'" % name)
+
         # Create a list with potential workspaces to look into
         # if a workspace is defined, it will contain only that workspace
         # if no workspace is defined, the list will contain all workspaces.
@@ -230,9 +537,12 @@ class Catalog(object):
 
         # Iterate over all workspaces to find the stores or store
         found_stores = {}
-        for ws in workspaces:
-            # Get all the store objects from geoserver
-            raw_stores = self.get_stores(workspace=ws)
+        # Get all the store objects from geoserver
+        if self.direct_lookups:
+            store_lists = self._map(lambda ws: self._get_stores_by_url(name, ws), workspaces)
+        else:
+            store_lists = self._map(self.get_stores, workspaces)
+        for ws, raw_stores in zip(workspaces, store_lists):
             # And put it in a dictionary where the keys are the name of the store,
             new_stores = dict(zip([s.name for s in raw_stores], raw_stores))
             # If the store is found, put it in a dict that also takes into account the
@@ -247,11 +557,26 @@ class Catalog(object):
         if len(found_stores) == 0:
             raise FailedRequestError("No store found named: " + name)
         elif len(found_stores) > 1:
-            raise AmbiguousRequestError("Multiple stores found named '" + name + "': "+ found_stores.keys())
+            raise AmbiguousRequestError("Multiple stores found named '%s': %s" % (name, ", ".join(found_stores)))
         else:
             return found_stores.values()[0]
 
 
+    def _get_stores_by_url(self, name, workspace):
+        """
+        GET the store named name in workspace directly, as a data store and
+        then as a coverage store, returning a list of at most one store.
+        """
+        for store_type, from_index in [("datastores", datastore_from_index),
+                                       ("coveragestores", coveragestore_from_index)]:
+            store_url = url(self.service_url,
+                ["workspaces", workspace.name, store_type, name + ".xml"])
+            dom = self._get_xml(store_url, allow_missing=True)
+            if dom is not None:
+                return [from_index(self, workspace, dom)]
+        return []
+
+    @_deadline
     def get_stores(self, workspace=None):
         if workspace is not None:
             if isinstance(workspace, basestring):
@@ -262,11 +587,7 @@ class Catalog(object):
             coveragestores = [coveragestore_from_index(self, workspace, n) for n in cs_list.findall("coverageStore")]
             return datastores + coveragestores
         else:
-            stores = []
-            for ws in self.get_workspaces():
-                a = self.get_stores(ws)
-                stores.extend(a)
-            return stores
+            return self._fan_out(self.get_stores, self.get_workspaces())
 
     def create_datastore(self, name, workspace=None):
         if isinstance(workspace, basestring):
@@ -286,7 +607,14 @@ class Catalog(object):
             workspace = self.get_default_workspace()
         return UnsavedCoverageStore(self, name, workspace)
 
-    def add_data_to_store(self, store, name, data, workspace=None, overwrite = False, charset = None):
+    def add_data_to_store(self, store, name, data, workspace=None, overwrite = False, charset = None, progress=None, external=False):
+        """
+        Upload shapefile data into an existing datastore: the path of a ZIP
+        archive, or a dict of extensions to paths or file-like objects.
+        With external set, data is instead the path of the .shp file as
+        GeoServer sees it, on a filesystem it shares with us, and only
+        that path is sent.
+        """
         if isinstance(store, basestring):
             store = self.get_store(store, workspace=workspace)
         if workspace is not None:
@@ -296,10 +624,16 @@ class Catalog(object):
             workspace = store.workspace.name
         store = store.name
 
-        if isinstance(data, dict):
-            bundle = prepare_upload_bundle(name, data)
+        headers = { 'Content-Type': 'application/zip', 'Accept': 'application/xml' }
+        method = "file.shp"
+        if external:
+            bundle = StringIO(_file_url(_external_shapefile(data)))
+            headers['Content-Type'] = 'text/plain'
+            method = "external.shp"
+        elif isinstance(data, dict):
+            bundle = spooled_upload_bundle(name, data)
         else:
-            bundle = data
+            bundle = open(data, "rb")
 
         params = dict()
         if overwrite:
@@ -307,107 +641,148 @@ class Catalog(object):
         if charset is not None:
             params["charset"] = charset
 
-        headers = { 'Content-Type': 'application/zip', 'Accept': 'application/xml' }
         upload_url = url(self.service_url, 
-            ["workspaces", workspace, "datastores", store, "file.shp"], params) 
+            ["workspaces", workspace, "datastores", store, method], params) 
 
-        with open(bundle, "rb") as f:
-            data = f.read()
-            headers, response = self.http.request(upload_url, "PUT", data, headers)
-            self._cache.clear()
+        try:
+            headers, response = self.http.upload(upload_url, "PUT", bundle, headers, progress)
+            self._invalidate_upload(workspace, "datastores", store)
             if headers.status != 201:
                 raise UploadError(response)
+        finally:
+            bundle.close()
 
-    def create_featurestore(self, name, data, workspace=None, overwrite=False, charset=None):
+    def create_featurestore(self, name, data, workspace=None, overwrite=False, charset=None, progress=None, external=False):
+        """
+        Create a datastore from shapefile data, given as for
+        add_data_to_store, external publishing included.
+        """
+        # the data goes to the default workspace, so that is the only one
+        # a conflicting store can be in
+        if workspace is None:
+            workspace = self.get_default_workspace()
         if not overwrite:
             try:
                 store = self.get_store(name, workspace)
-                msg = "There is already a store named " + name
-                if workspace:
-                    msg += " in " + str(workspace)
-                raise ConflictingDataError(msg)
+                raise ConflictingDataError("There is already a store named %s in %s" % (
+                    name, _name(workspace)))
             except FailedRequestError:
                 # we don't really expect that every layer name will be taken
                 pass
-
-        if workspace is None:
-            workspace = self.get_default_workspace()
         workspace = _name(workspace)
         params = dict()
         if charset is not None:
             params['charset'] = charset
-        ds_url = url(self.service_url,
-            ["workspaces", workspace, "datastores", name, "file.shp"], params)
 
         # PUT /workspaces/<ws>/datastores/<ds>/file.shp
         headers = {
             "Content-type": "application/zip",
             "Accept": "application/xml"
         }
-        if isinstance(data,dict):
+        method = "file.shp"
+        if external:
+            logger.debug('Data is on the server')
+            message = StringIO(_file_url(_external_shapefile(data)))
+            headers["Content-type"] = "text/plain"
+            method = "external.shp"
+        elif isinstance(data,dict):
             logger.debug('Data is NOT a zipfile')
-            archive = prepare_upload_bundle(name, data)
+            message = spooled_upload_bundle(name, data)
         else:
             logger.debug('Data is a zipfile')
-            archive = data
-        message = open(archive)
+            message = open(data, "rb")
+        ds_url = url(self.service_url,
+            ["workspaces", workspace, "datastores", name, method], params)
         try:
-            headers, response = self.http.request(ds_url, "PUT", message, headers)
-            self._cache.clear()
+            headers, response = self.http.upload(ds_url, "PUT", message, headers, progress)
+            self._invalidate_upload(workspace, "datastores", name)
             if headers.status != 201:
                 raise UploadError(response)
         finally:
             message.close()
-            unlink(archive)
 
-    def create_coveragestore(self, name, data, workspace=None, overwrite=False):
+    def create_coveragestore(self, name, data, workspace=None, overwrite=False, progress=None, external=False):
+        """
+        Create a coveragestore from raster data: the path of a GeoTIFF, a
+        file-like object, or a dict of extensions to paths or file-like
+        objects, which is uploaded as a world image if it has a "tfw".
+        With external set, data is instead the path of the raster as
+        GeoServer sees it, on a filesystem it shares with us, and only that
+        path is sent; a directory is published as an image mosaic.
+        """
+        # the data goes to the default workspace, so that is the only one
+        # a conflicting store can be in
+        if workspace is None:
+            workspace = self.get_default_workspace()
         if not overwrite:
             try:
                 store = self.get_store(name, workspace)
-                msg = "There is already a store named " + name
-                if workspace:
-                    msg += " in " + str(workspace)
-                raise ConflictingDataError(msg)
+                raise ConflictingDataError("There is already a store named %s in %s" % (
+                    name, _name(workspace)))
             except FailedRequestError:
                 # we don't really expect that every layer name will be taken
                 pass
-
-        if workspace is None:
-            workspace = self.get_default_workspace()
         headers = {
             "Content-type": "image/tiff",
             "Accept": "application/xml"
         }
 
-        archive = None
+        method = "file."
         ext = "geotiff"
 
-        if isinstance(data, dict):
-            archive = prepare_upload_bundle(name, data)
-            message = open(archive)
+        if external:
+            path, ext = _external_coverage(data)
+            message = StringIO(_file_url(path))
+            headers['Content-type'] = 'text/plain'
+            method = "external."
+        elif isinstance(data, dict):
+            message = spooled_upload_bundle(name, data)
             if "tfw" in data:
                 headers['Content-type'] = 'application/archive'
                 ext = "worldimage"
         elif isinstance(data, basestring):
-            message = open(data)
+            message = open(data, "rb")
         else:
             message = data
 
         cs_url = url(self.service_url,
-            ["workspaces", workspace.name, "coveragestores", name, "file." + ext])
+            ["workspaces", _name(workspace), "coveragestores", name, method + ext])
 
         try:
-            headers, response = self.http.request(cs_url, "PUT", message, headers)
-            self._cache.clear()
+            headers, response = self.http.upload(cs_url, "PUT", message, headers, progress)
+            self._invalidate_upload(_name(workspace), "coveragestores", name)
             if headers.status != 201:
                 raise UploadError(response)
         finally:
             if hasattr(message, "close"):
                 message.close()
-            if archive is not None:
-                unlink(archive)
 
+    def bulk_ingest(self, items, workers=4, **kwargs):
+        """
+        Publish many datasets concurrently and return an IngestReport; see
+        geoserver.ingest.bulk_ingest for the arguments.
+        """
+        # ingest builds on this module, so import it late
+        from geoserver.ingest import bulk_ingest
+        return bulk_ingest(self, items, workers, **kwargs)
+
+    @_deadline
     def get_resource(self, name, store=None, workspace=None):
+        if self._index is not None:
+            ws_name = _name(workspace)
+            if store is not None and not isinstance(store, basestring):
+                ws_name = store.workspace.name
+            indexed = [r for r in self._index.resources(name, workspace=ws_name)
+                       if store is None or r.store.name == _name(store)]
+            # without a store, the first match wins, as in the crawl below
+            if len(indexed) == 1 or (indexed and store is None):
+                return indexed[0]
+
+        if self.direct_lookups and store is not None:
+            if isinstance(store, basestring):
+                store = self.get_store(store, workspace)
+            return self._get_resource_by_url(name, store)
+
         if store is not None and workspace is not None:
             if isinstance(workspace, basestring):
                 workspace = self.get_workspace(workspace)
@@ -438,7 +813,25 @@ class Catalog(object):
                 return resource
         return None
 
+    def _get_resource_by_url(self, name, store):
+        resource = FeatureType if isinstance(store, DataStore) else Coverage
+        resource_url = url(self.service_url,
+            ["workspaces", store.workspace.name, resource.url_part_stores,
+             store.name, resource.url_part_types, name + ".xml"])
+        dom = self._get_xml(resource_url, allow_missing=True)
+        if dom is None:
+            return None
+        return resource(self, store.workspace, store, dom.find("name").text)
+
     def get_resource_by_url(self, url):
+        # the href of a resource tells its type, so only fetch it if it doesn't
+        for resource in [FeatureType, Coverage]:
+            if "/%s/" % resource.url_part_types in url:
+                # rebuild it from its names under our own service URL: the
+                # href has the base URL and format GeoServer advertises,
+                # which may be a proxy's, or .json
+                linked = resource(self, None, None, None, href=url)
+                return resource(self, linked.workspace, linked.store, linked.name)
         xml = self.get_xml(url)
         name = xml.find("name").text
         resource = None
@@ -450,6 +843,7 @@ class Catalog(object):
             raise Exception('drat')
         return resource(self, None, None, name, href=url)
 
+    @_deadline
     def get_resources(self, store=None, workspace=None):
         if isinstance(workspace, basestring):
             workspace = self.get_workspace(workspace)
@@ -457,17 +851,34 @@ class Catalog(object):
             store = self.get_store(store, workspace)
         if store is not None:
             return store.get_resources()
-        if workspace is not None:
-            resources = []
-            for store in self.get_stores(workspace):
-                resources.extend(self.get_resources(store))
-            return resources
-        resources = []
-        for ws in self.get_workspaces():
-            resources.extend(self.get_resources(workspace=ws))
-        return resources
+        return self._fan_out(lambda s: s.get_resources(), self.get_stores(workspace))
 
+    def iter_resources(self, store=None, workspace=None):
+        """
+        Like get_resources, but yield the resources as each store's
+        listing is read rather than collecting them first.  The resources
+        are ResourceSummary objects, see geoserver.summary.
+        """
+        if isinstance(workspace, basestring):
+            workspace = self.get_workspace(workspace)
+        if isinstance(store, basestring):
+            store = self.get_store(store, workspace)
+        stores = [store] if store is not None else self.get_stores(workspace)
+        for store in stores:
+            resource = FeatureType if isinstance(store, DataStore) else Coverage
+            listing_url = url(self.service_url,
+                ["workspaces", store.workspace.name, resource.url_part_stores,
+                 store.name, resource.url_part_types + ".xml"])
+            for node in self._iter_xml(listing_url, resource.resource_type):
+                yield ResourceSummary(self, store.workspace, store,
+                    node.find("name").text, resource)
+
+    @_deadline
     def get_layer(self, name):
+        if self._index is not None:
+            indexed = self._index.layers(name)
+            if indexed:
+                return indexed[0]
         try:
             lyr = Layer(self, name)
             lyr.fetch()
@@ -475,6 +886,7 @@ class Catalog(object):
         except FailedRequestError:
             return None
 
+    @_deadline
     def get_layers(self, resource=None):
         if isinstance(resource, basestring):
             resource = self.get_resource(resource)
@@ -482,10 +894,27 @@ class Catalog(object):
         description = self.get_xml(layers_url)
         lyrs = [Layer(self, l.find("name").text) for l in description.findall("layer")]
         if resource is not None:
-            lyrs = [l for l in lyrs if l.resource.href == resource.href]
+            key = (resource.resource_type, resource.workspace.name,
+                resource.store.name, resource.name)
+            def serves(layer):
+                r = layer.resource
+                return (r.resource_type, r.workspace.name, r.store.name, r.name) == key
+            matches = self._map(serves, lyrs)
+            lyrs = [l for (l, match) in zip(lyrs, matches) if match]
         # TODO: Filter by style
         return lyrs
 
+    def iter_layers(self):
+        """
+        Like get_layers, but yield the layers one at a time as the listing
+        is read, for catalogs too large to hold in memory at once.  The
+        layers are LayerSummary objects, see geoserver.summary.
+        """
+        layers_url = url(self.service_url, ["layers.xml"])
+        for node in self._iter_xml(layers_url, "layer"):
+            yield LayerSummary(self, node.find("name").text)
+
+    @_deadline
     def get_layergroup(self, name=None):
         try: 
             group_url = url(self.service_url, ["layergroups", name + ".xml"])
@@ -494,17 +923,27 @@ class Catalog(object):
         except FailedRequestError:
             return None
 
+    @_deadline
     def get_layergroups(self):
         groups = self.get_xml("%s/layergroups.xml" % self.service_url)
         return [LayerGroup(self, g.find("name").text) for g in groups.findall("layerGroup")]
 
     def create_layergroup(self, name, layers = (), styles = (), bounds = None):
-        if any(g.name == name for g in self.get_layergroups()):
+        if self.direct_lookups:
+            exists = self.get_layergroup(name) is not None
+        else:
+            exists = any(g.name == name for g in self.get_layergroups())
+        if exists:
             raise ConflictingDataError("LayerGroup named %s already exists!" % name)
         else:
             return UnsavedLayerGroup(self, name, layers, styles, bounds)
 
+    @_deadline
     def get_style(self, name):
+        if self._index is not None:
+            indexed = self._index.styles(name)
+            if indexed:
+                return indexed[0]
         try:
             style_url = url(self.service_url, ["styles", name + ".xml"])
             dom = self.get_xml(style_url)
@@ -514,27 +953,51 @@ class Catalog(object):
 
     def get_style_by_url(self, style_workspace_url):
         try:
-            dom = self.get_xml(style_workspace_url)
-            rest_path = style_workspace_url[re.search(self.service_url, style_workspace_url).end():]
-            rest_segments = re.split("\/", rest_path)
-            for i,s in enumerate(rest_segments):
-                if s == "workspaces": workspace_name = rest_segments[i + 1]
-            #create an instance of Workspace_Style if a workspace is contained in the
-            # REST API style path (should always be the case /workspaces/<ws>/styles/<stylename>:
-            if isinstance(workspace_name, basestring):
-                workspace = self.get_workspace(workspace_name)
-                return Workspace_Style(self, workspace, dom.find("name").text)
-            else:
-                return Style(self, dom.find("name").text)
-            
+            self.get_xml(style_workspace_url)
         except FailedRequestError:
             return None
+        return style_from_url(self, style_workspace_url)
 
-    def get_styles(self):
+    @_deadline
+    def get_styles(self, workspace=None):
+        if workspace is not None:
+            workspace = _name(workspace)
+            styles_url = url(self.service_url, ["workspaces", workspace, "styles.xml"])
+            description = self.get_xml(styles_url)
+            workspace = Workspace(self, workspace)
+            return [Workspace_Style(self, workspace, s.find('name').text) for s in description.findall("style")]
         styles_url = url(self.service_url, ["styles.xml"])
         description = self.get_xml(styles_url)
         return [Style(self, s.find('name').text) for s in description.findall("style")]
 
+    def iter_styles(self, workspace=None):
+        """
+        Like get_styles, but yield the styles, as StyleSummary objects,
+        one at a time as the listing is read.
+        """
+        if workspace is not None:
+            workspace = Workspace(self, _name(workspace))
+            styles_url = url(self.service_url, ["workspaces", workspace.name, "styles.xml"])
+            for node in self._iter_xml(styles_url, "style"):
+                yield StyleSummary(self, node.find("name").text, workspace)
+        else:
+            styles_url = url(self.service_url, ["styles.xml"])
+            for node in self._iter_xml(styles_url, "style"):
+                yield StyleSummary(self, node.find("name").text)
+
+    def _find_style(self, name):
+        """
+        Find a style by the name a layer refers to it by, "<style>" or
+        "<workspace>:<style>", in the styles.xml listings.  The listings are
+        cached, so resolving the styles of many layers costs one request per
+        listing rather than one per style.
+        """
+        workspace, _, name = name.rpartition(":")
+        for style in self.get_styles(workspace or None):
+            if style.name == name:
+                return style
+        return None
+
     def create_style(self, name, data, overwrite = False):
         if overwrite == False and self.get_style(name) is not None:
             raise ConflictingDataError("There is already a style named %s" % name)
@@ -551,7 +1014,7 @@ class Catalog(object):
             style_url = url(self.service_url, ["styles"], dict(name=name))
             headers, response = self.http.request(style_url, "POST", data, headers)
 
-        self._cache.clear()
+        self._invalidate(url(self.service_url, ["styles", name + ".xml"]))
         if headers.status < 200 or headers.status > 299: raise UploadError(response)
 
     def create_workspace(self, name, uri):
@@ -564,14 +1027,33 @@ class Catalog(object):
 
         headers, response = self.http.request(workspace_url, "POST", xml, headers)
         assert 200 <= headers.status < 300, "Tried to create workspace but got " + str(headers.status) + ": " + response
-        self._cache.clear()
+        self._invalidate(url(self.service_url, ["workspaces", name + ".xml"]))
         return self.get_workspace(name)
 
+    @_deadline
     def get_workspaces(self):
         description = self.get_xml("%s/workspaces.xml" % self.service_url)
         return [workspace_from_index(self, node) for node in description.findall("workspace")]
 
+    def iter_workspaces(self):
+        """
+        Like get_workspaces, but yield the workspaces one at a time as the
+        listing is read.
+        """
+        workspaces_url = url(self.service_url, ["workspaces.xml"])
+        for node in self._iter_xml(workspaces_url, "workspace"):
+            yield workspace_from_index(self, node)
+
+    @_deadline
     def get_workspace(self, name):
+        if self._index is not None:
+            indexed = self._index.workspaces(name)
+            if indexed:
+                return indexed[0]
+        if self.direct_lookups:
+            dom = self._get_xml(url(self.service_url, ["workspaces", name + ".xml"]),
+                allow_missing=True)
+            return workspace_from_index(self, dom) if dom is not None else None
         candidates = [w for w in self.get_workspaces() if w.name == name]
         if len(candidates) == 0:
             return None
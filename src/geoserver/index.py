@@ -0,0 +1,129 @@
+import copy
+import logging
+import threading
+import time
+
+logger = logging.getLogger("gsconfig.index")
+
+def _qualify(*parts):
+    return ":".join(parts)
+
+def _copy(obj):
+    # hand out a private copy, as a REST lookup would, so that changes
+    # callers make before saving don't leak into the index
+    clone = copy.copy(obj)
+    clone.dirty = dict(obj.dirty)
+    clone.dom = None
+    return clone
+
+class CatalogIndex(object):
+    """
+    A snapshot of the names in a catalog, for answering lookups without
+    crawling the REST API.  Workspaces, stores, resources, layers and
+    styles are keyed by name and by qualified name:
+
+    - stores by "<store>" and "<workspace>:<store>"
+    - resources by "<resource>", "<workspace>:<resource>" and
+      "<workspace>:<store>:<resource>"
+
+    Each key maps to the list of matching objects, in catalog order.
+    Catalog.build_index() builds one and makes the catalog's get_* lookups
+    consult it first; lookups that miss still go to the REST API, and
+    writes through the catalog drop the entries they may have changed.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.built = None
+        self._tables = dict((kind, dict()) for kind in
+            ["workspaces", "stores", "resources", "layers", "styles"])
+        self._lock = threading.Lock()
+
+    def build(self, kinds=None):
+        """
+        Fetch the whole catalog, using the catalog's worker threads for the
+        per-workspace and per-store listings, and replace the index contents.
+        With kinds, some of "workspaces", "stores", "resources", "layers" and
+        "styles", only those are fetched; the others are left empty, except
+        the workspaces, which every other listing needs.
+        """
+        cat = self.catalog
+        kinds = set(self._tables if kinds is None else kinds)
+        start = time.time()
+        workspaces = cat.get_workspaces()
+        stores = resources = layers = styles = []
+        if kinds & set(["stores", "resources"]):
+            stores = cat._fan_out(cat.get_stores, workspaces)
+        if "resources" in kinds:
+            resources = cat._fan_out(lambda s: s.get_resources(), stores)
+        if "layers" in kinds:
+            layers = cat.get_layers()
+        if "styles" in kinds:
+            styles = cat.get_styles()
+
+        tables = dict((kind, dict()) for kind in self._tables)
+        def add(kind, keys, obj):
+            entry = (obj.href, obj)
+            for key in keys:
+                tables[kind].setdefault(key, []).append(entry)
+
+        for ws in workspaces:
+            add("workspaces", [ws.name], ws)
+        for store in stores:
+            add("stores", [store.name, _qualify(store.workspace.name, store.name)], store)
+        for resource in resources:
+            ws_name, store_name = resource.workspace.name, resource.store.name
+            add("resources", [resource.name,
+                _qualify(ws_name, resource.name),
+                _qualify(ws_name, store_name, resource.name)], resource)
+        for layer in layers:
+            add("layers", [layer.name], layer)
+        for style in styles:
+            add("styles", [style.name], style)
+
+        with self._lock:
+            self._tables = tables
+        self.built = time.time()
+        logger.debug("indexed %d workspaces, %d stores, %d resources, %d layers and %d styles in %.2fs",
+            len(workspaces), len(stores), len(resources), len(layers), len(styles),
+            self.built - start)
+        return self
+
+    def _find(self, kind, key):
+        with self._lock:
+            return [_copy(obj) for (href, obj) in self._tables[kind].get(key, [])]
+
+    def workspaces(self, name):
+        return self._find("workspaces", name)
+
+    def stores(self, name, workspace=None):
+        if workspace is not None:
+            return self._find("stores", _qualify(workspace, name))
+        return self._find("stores", name)
+
+    def resources(self, name, store=None, workspace=None):
+        if store is not None and workspace is not None:
+            return self._find("resources", _qualify(workspace, store, name))
+        if workspace is not None:
+            return self._find("resources", _qualify(workspace, name))
+        return self._find("resources", name)
+
+    def layers(self, name):
+        return self._find("layers", name)
+
+    def styles(self, name):
+        return self._find("styles", name)
+
+    def forget(self, prefixes):
+        """
+        Drop every entry whose href starts with one of prefixes.
+        """
+        prefixes = tuple(prefixes)
+        with self._lock:
+            for table in self._tables.values():
+                for key, entries in table.items():
+                    kept = [e for e in entries if not e[0].startswith(prefixes)]
+                    if not kept:
+                        del table[key]
+                    elif len(kept) < len(entries):
+                        table[key] = kept
@@ -0,0 +1,239 @@
+"""
+Publishing many datasets at once; see Catalog.bulk_ingest.
+"""
+
+from collections import namedtuple
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from geoserver.catalog import ConflictingDataError
+from geoserver.index import CatalogIndex
+from geoserver.support import prepare_upload_bundle
+from geoserver.transport import body_length
+
+logger = logging.getLogger("gsconfig.ingest")
+
+MAX_IN_FLIGHT = 256 * 1024 * 1024
+## The default limit on the bytes of data being uploaded at once.
+
+IngestResult = namedtuple("IngestResult",
+    ["item", "error", "prepare_time", "upload_time", "bytes"])
+## The outcome of publishing one IngestItem: the exception that stopped it,
+## or None, the seconds spent bundling and uploading it, and the bytes sent.
+
+class IngestItem(object):
+    """
+    One dataset for bulk_ingest to publish as a new store named ``name``,
+    from ``data`` as create_featurestore or create_coveragestore take it.
+    ``kind`` is "featurestore" or "coveragestore"; by default shapefiles
+    (a dict with a "shp", or a .shp or .zip path) make feature stores and
+    anything else coverage stores.
+    """
+
+    def __init__(self, name, data, workspace=None, kind=None, overwrite=False,
+            charset=None, external=False):
+        if kind is None:
+            if isinstance(data, dict):
+                shapefile = "shp" in data
+            else:
+                shapefile = isinstance(data, basestring) and \
+                    data.lower().endswith((".shp", ".zip"))
+            kind = "featurestore" if shapefile else "coveragestore"
+        if kind not in ("featurestore", "coveragestore"):
+            raise ValueError("kind must be 'featurestore' or 'coveragestore', not %r" % kind)
+        self.name = name
+        self.data = data
+        self.workspace = workspace
+        self.kind = kind
+        self.overwrite = overwrite
+        self.charset = charset
+        self.external = external
+
+    def __repr__(self):
+        return "<IngestItem %s %s>" % (self.kind, self.name)
+
+class IngestReport(object):
+    """
+    The results of a bulk_ingest, one IngestResult per item and in the
+    same order, and the seconds the whole run took.
+    """
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def succeeded(self):
+        return [r for r in self.results if r.error is None]
+
+    @property
+    def failed(self):
+        return [r for r in self.results if r.error is not None]
+
+    @property
+    def datasets_per_minute(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return 60 * len(self.succeeded) / self.elapsed
+
+    def __str__(self):
+        return "%d of %d datasets published in %.1fs (%.1f per minute)" % (
+            len(self.succeeded), len(self.results), self.elapsed, self.datasets_per_minute)
+
+def _prepare(job):
+    # runs in a worker process, so it must be importable and return
+    # something picklable
+    position, name, data, compression = job
+    start = time.time()
+    try:
+        return position, prepare_upload_bundle(name, data, compression), time.time() - start, None
+    except Exception, e:
+        return position, None, time.time() - start, "%s: %s" % (type(e).__name__, e)
+
+def _size(data):
+    if isinstance(data, basestring):
+        return os.path.getsize(data) if os.path.isfile(data) else 0
+    elif isinstance(data, dict):
+        return sum(_size(member) for member in data.values())
+    else:
+        return body_length(data) or 0
+
+class _Budget(object):
+    """
+    A limit on the bytes in flight.  A single upload larger than the limit
+    may still go ahead, alone.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._changed = threading.Condition()
+
+    def acquire(self, amount):
+        with self._changed:
+            while self.used and self.used + amount > self.limit:
+                self._changed.wait()
+            self.used += amount
+
+    def release(self, amount):
+        with self._changed:
+            self.used -= amount
+            self._changed.notify_all()
+
+def bulk_ingest(catalog, items, workers=4, processes=None, max_in_flight=MAX_IN_FLIGHT,
+        compression=None):
+    """
+    Publish each of items, IngestItems or dicts of IngestItem arguments,
+    and return an IngestReport.  A failed item doesn't stop the others.
+
+    Name conflicts are checked once, against a single snapshot of the
+    catalog's stores (the catalog's index, if it has one), and between the
+    items themselves.  Items without a workspace go to the default one.
+    Shapefiles
+    given as dicts of paths are bundled by a pool of ``processes`` worker
+    processes (one per CPU by default, none if 0) with the given ZIP
+    ``compression`` (see spooled_upload_bundle), and uploaded as soon as
+    they are ready.  Up to ``workers`` uploads run at once, as long as
+    they carry no more than ``max_in_flight`` bytes between them.
+    """
+    start = time.time()
+    items = [item if isinstance(item, IngestItem) else IngestItem(**item) for item in items]
+    results = [None] * len(items)
+    workspaces = [None] * len(items)
+    index = catalog._index or CatalogIndex(catalog).build(["stores"])
+    default_workspace = None
+
+    pending = []
+    claimed = set()
+    for position, item in enumerate(items):
+        workspace = item.workspace
+        if workspace is None:
+            if default_workspace is None:
+                # the index knows workspaces by their real names
+                default = catalog.get_default_workspace()
+                default.fetch()
+                default_workspace = default.dom.find("name").text
+            workspace = default_workspace
+        elif not isinstance(workspace, basestring):
+            workspace = workspace.name
+        workspaces[position] = workspace
+        if (workspace, item.name) in claimed:
+            error = ConflictingDataError("%s:%s is in this batch more than once" % (workspace, item.name))
+        elif not item.overwrite and index.stores(item.name, workspace):
+            error = ConflictingDataError("There is already a store named %s in %s" % (item.name, workspace))
+        else:
+            error = None
+        claimed.add((workspace, item.name))
+        if error is not None:
+            results[position] = IngestResult(item, error, 0.0, 0.0, 0)
+        else:
+            pending.append(position)
+
+    budget = _Budget(max_in_flight)
+
+    def upload(position, bundle=None, prepare_time=0.0):
+        # runs on the upload pool, which drops exceptions, so every way
+        # out must leave a result
+        item = items[position]
+        size = 0
+        started = None
+        error = None
+        try:
+            size = 0 if item.external else _size(bundle or item.data)
+            budget.acquire(size)
+            started = time.time()
+            try:
+                if item.kind == "featurestore":
+                    catalog.create_featurestore(item.name, bundle or item.data, workspaces[position],
+                        overwrite=True, charset=item.charset, external=item.external)
+                else:
+                    catalog.create_coveragestore(item.name, item.data, workspaces[position],
+                        overwrite=True, external=item.external)
+            finally:
+                budget.release(size)
+        except Exception, e:
+            error = e
+        if bundle is not None:
+            try:
+                os.unlink(bundle)
+            except OSError, e:
+                logger.warning("could not remove the bundle %s: %s", bundle, e)
+        elapsed = time.time() - started if started is not None else 0.0
+        results[position] = IngestResult(item, error, prepare_time, elapsed, size)
+        logger.debug("%s: %s in %.2fs", item.name, error or "published", elapsed)
+
+    def bundled(position):
+        item = items[position]
+        return (item.kind == "featurestore" and not item.external and
+            isinstance(item.data, dict) and
+            all(isinstance(member, basestring) for member in item.data.values()))
+
+    jobs = [(position, items[position].name, items[position].data, compression)
+            for position in pending if processes != 0 and bundled(position)]
+    bundling = set(job[0] for job in jobs)
+    # fork the bundling processes before any upload threads exist
+    bundlers = multiprocessing.Pool(processes) if jobs else None
+    uploads = ThreadPool(workers)
+    try:
+        for position in pending:
+            if position not in bundling:
+                uploads.apply_async(upload, (position,))
+        if bundlers is not None:
+            for position, bundle, prepare_time, error in bundlers.imap_unordered(_prepare, jobs):
+                if error is not None:
+                    results[position] = IngestResult(items[position], Exception(error), prepare_time, 0.0, 0)
+                else:
+                    uploads.apply_async(upload, (position, bundle, prepare_time))
+    finally:
+        if bundlers is not None:
+            bundlers.close()
+            bundlers.join()
+        uploads.close()
+        uploads.join()
+
+    report = IngestReport(results, time.time() - start)
+    logger.info("%s", report)
+    return report
@@ -0,0 +1,134 @@
+"""
+Read-only ElementTree look-alikes over GeoServer's JSON representations, so
+that code written against the XML documents can read the JSON ones.
+
+GeoServer renders its JSON with the same element names as its XML, with a
+few conventions of its own:
+
+- repeated elements become a list under a single key
+- attributes become keys prefixed with "@", and the text of an element
+  that also has attributes goes under "$"
+- atom:link children become a plain "href" key
+- numbers and booleans are unquoted, and empty collections are ""
+
+JSONElement maps those back: find("layer") matches every item of a
+"layer" list, attrib holds the "@" keys, text holds "$" or the scalar
+value as a string, and "href" keys are also reachable as atom:link
+children.  Numbers keep their exact JSON spelling.
+"""
+
+import json
+import re
+
+ATOM_LINK = "{http://www.w3.org/2005/Atom}link"
+
+# path steps, where a namespace URI in braces may itself contain slashes
+_STEP = re.compile(r"(?:\{[^}]*\})?[^/]+")
+
+def parse(content):
+    """
+    Parse a GeoServer JSON document and return its root element.  Raises
+    ValueError if content is not a JSON object with a single member.
+    """
+    doc = json.loads(content, parse_float=str, parse_int=str)
+    if not isinstance(doc, dict) or len(doc) != 1:
+        raise ValueError("expected a JSON object with one member")
+    (tag, value), = doc.items()
+    return JSONElement(tag, value)
+
+def _text(value):
+    if isinstance(value, dict):
+        value = value.get("$")
+    if value is True:
+        return "true"
+    elif value is False:
+        return "false"
+    elif value is None or isinstance(value, basestring):
+        return value
+    else:
+        return json.dumps(value)
+
+class JSONElement(object):
+    """
+    An element of a parsed JSON document, with the parts of the
+    ElementTree element API that gsconfig reads: tag, text, attrib, get(),
+    find(), findall(), findtext() and iteration over children.  Paths may
+    use "*" and "." steps like ElementTree's simple paths.
+    """
+
+    __slots__ = ("tag", "_value")
+
+    tail = None
+
+    def __init__(self, tag, value):
+        self.tag = tag
+        self._value = value
+
+    def __repr__(self):
+        return "<JSONElement %r at %#x>" % (self.tag, id(self))
+
+    @property
+    def text(self):
+        return _text(self._value)
+
+    @property
+    def attrib(self):
+        if not isinstance(self._value, dict):
+            return dict()
+        return dict((key[1:], _text(value)) for key, value in self._value.iteritems()
+            if key.startswith("@"))
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+    def keys(self):
+        return self.attrib.keys()
+
+    def items(self):
+        return self.attrib.items()
+
+    def _children(self, tag):
+        value = self._value
+        if not isinstance(value, dict):
+            return []
+        if tag == "*":
+            return [child for key in value if key[:1] not in ("@", "$")
+                for child in self._children(ATOM_LINK if key == "href" else key)]
+        if tag == ATOM_LINK:
+            href = value.get("href")
+            if not isinstance(href, basestring):
+                return []
+            return [JSONElement(ATOM_LINK, {"@rel": "alternate", "@href": href,
+                "@type": "application/json"})]
+        if tag[:1] in ("@", "$") or tag not in value:
+            return []
+        child = value[tag]
+        if isinstance(child, list):
+            return [JSONElement(tag, item) for item in child]
+        return [JSONElement(tag, child)]
+
+    def findall(self, path):
+        nodes = [self]
+        for step in _STEP.findall(path):
+            if step != ".":
+                nodes = [child for node in nodes for child in node._children(step)]
+        return nodes
+
+    def find(self, path):
+        nodes = self.findall(path)
+        return nodes[0] if nodes else None
+
+    def findtext(self, path, default=None):
+        node = self.find(path)
+        if node is None:
+            return default
+        return node.text or ""
+
+    def getchildren(self):
+        return self._children("*")
+
+    def __iter__(self):
+        return iter(self._children("*"))
+
+    def __len__(self):
+        return len(self._children("*"))
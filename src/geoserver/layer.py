@@ -1,5 +1,5 @@
 from geoserver.support import ResourceInfo, xml_property, write_bool, url
-from geoserver.style import Style
+from geoserver.style import style_from_url
 
 class _attribution(object):
     def __init__(self, title, width, height):
@@ -74,33 +74,36 @@ class Layer(ResourceInfo):
     def resource(self):
         if self.dom is None: 
             self.fetch()
+        # the atom link names the exact resource, so we needn't search for it
+        link = self.dom.find("resource/{http://www.w3.org/2005/Atom}link")
+        if link is not None and link.get("href"):
+            return self.catalog.get_resource_by_url(link.get("href"))
         name = self.dom.find("resource/name").text
         return self.catalog.get_resource(name)
 
+    def _resolve_style(self, node):
+        # the atom link tells us where the style lives, global or in a
+        # workspace, without a request; only look it up by name without one
+        link = node.find("{http://www.w3.org/2005/Atom}link")
+        if link is not None and link.get("href"):
+            return style_from_url(self.catalog, link.get("href"))
+        return self.catalog._find_style(node.find("name").text)
+
     def _get_default_style(self):
         if 'default_style' in self.dirty:
             return self.dirty['default_style']
         if self.dom is None:
             self.fetch()
-        name = self.dom.find("defaultStyle/name")
+        node = self.dom.find("defaultStyle")
         # aborted data uploads can result in no default style
-        if name is not None:
-            style = self.catalog.get_style(name.text)
-            # the default catalog.get_style may not return a valid style if it is stored in a workspace
-            # in this case obtain the style be reading the style url directly:
-            if style is not None:
-                return style
-            else:
-                #atom_link = self.dom.find("defaultStyle/{atom}link[@rel]")
-                #atom_link = self.dom.find("defaultStyle/link[@rel]")
-                style_workspace_url = self.dom.find("defaultStyle").getchildren()[1].attrib.get("href")
-                style = self.catalog.get_style_by_url(style_workspace_url)
-                return style
+        if node is not None and node.find("name") is not None:
+            return self._resolve_style(node)
         else:
             return None
 
     def _set_default_style(self, style):
-        if isinstance(style, Style):
+        # any object with a name will do, such as a StyleSummary
+        if not isinstance(style, basestring) and hasattr(style, "name"):
             style = style.name
         self.dirty["default_style"] = style
 
@@ -110,18 +113,7 @@ class Layer(ResourceInfo):
         if self.dom is None:
             self.fetch()
         styles_list = self.dom.findall("styles/style")
-        #styles = self.dom.findall("styles/style/name")
-        
-        alternate_styles = []
-        for s in styles_list:
-            style = self.catalog.get_style(s.find("name").text)
-            if style is not None:
-                alternate_styles.append(style)
-            else:
-                style_workspace_url = s.getchildren()[1].attrib.get("href")
-                style = self.catalog.get_style_by_url(style_workspace_url)
-                alternate_styles.append(style)
-        return alternate_styles
+        return [self._resolve_style(s) for s in styles_list]
 
     def _set_alternate_styles(self, styles):
         self.dirty["alternate_styles"] = styles
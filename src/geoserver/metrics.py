@@ -0,0 +1,137 @@
+"""
+Instrumentation for the REST requests an HttpPool sends.
+
+Each request the pool sends, retries included, is reported to the pool's
+listeners twice: to request_started just before it goes out, and to
+request_finished once the response is in, or the request has failed.
+Streamed responses count as finished when their headers are in, so their
+events carry no bytes received; the body is only counted in the pool's
+totals, see HttpPool.stats.  Both get a RequestEvent.  Every pool has a RequestMetrics listener, which keeps the
+counters and latency histograms that Catalog.stats() reports; others, for
+instance one feeding an external metrics system, can be added with
+HttpPool.add_listener or the listeners argument of Catalog.
+"""
+
+import bisect
+import threading
+from collections import namedtuple
+from os.path import splitext
+from urlparse import urlparse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+## The upper bounds, in seconds, of the buckets of the latency histograms;
+## slower requests fall in one more bucket with no upper bound.
+
+RequestEvent = namedtuple("RequestEvent",
+    ["method", "url", "endpoint", "status", "bytes_sent", "bytes_received",
+     "duration", "error"])
+## A request sent by an HttpPool: the endpoint is the URL's template (see
+## endpoint()), the bytes are counted on the wire, and the duration is in
+## seconds.  request_started gets no status, duration or error and no
+## bytes; request_finished gets the status, or the exception that stopped
+## the request.
+
+# The name in a REST path that follows each of these collections stands for
+_PLACEHOLDERS = {
+    "workspaces": "workspace",
+    "namespaces": "namespace",
+    "datastores": "store",
+    "coveragestores": "store",
+    "wmsstores": "store",
+    "featuretypes": "resource",
+    "coverages": "resource",
+    "wmslayers": "resource",
+    "layers": "layer",
+    "layergroups": "layergroup",
+    "styles": "style"
+}
+
+def endpoint(service_url, uri):
+    """
+    Return the template of the REST endpoint uri belongs to: its path below
+    service_url, with the names of catalog objects replaced by placeholders
+    and the format extension dropped.  For instance
+    <service_url>/workspaces/sf/datastores/roads.xml becomes
+    "/workspaces/{workspace}/datastores/{store}".
+    """
+    path = urlparse(uri).path
+    base = urlparse(service_url).path.rstrip("/")
+    if path.startswith(base + "/"):
+        path = path[len(base):]
+    template = []
+    collection = None
+    for part in path.split("/"):
+        if not part:
+            continue
+        if collection is not None:
+            template.append("{%s}" % _PLACEHOLDERS[collection])
+            collection = None
+            continue
+        name, extension = splitext(part)
+        if extension in (".xml", ".json", ".html"):
+            part = name
+        template.append(part)
+        if part in _PLACEHOLDERS:
+            collection = part
+    return "/" + "/".join(template)
+
+class RequestListener(object):
+    """
+    The interface of HttpPool listeners; override either method.  They are
+    called on the thread sending the request, so they should be quick and
+    must be thread-safe.  Exceptions they raise are logged and ignored.
+    """
+
+    def request_started(self, event):
+        pass
+
+    def request_finished(self, event):
+        pass
+
+class RequestMetrics(RequestListener):
+    """
+    Counts the requests finished for each method and endpoint template,
+    with how many failed (an error or a status of 400 or more), the bytes
+    they moved, the seconds they took and a histogram of their latencies
+    over ``buckets``.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._endpoints = dict()
+        self._lock = threading.Lock()
+
+    def request_finished(self, event):
+        key = "%s %s" % (event.method, event.endpoint)
+        failed = event.error is not None or event.status >= 400
+        with self._lock:
+            counts = self._endpoints.get(key)
+            if counts is None:
+                counts = self._endpoints[key] = dict(requests=0, errors=0,
+                    bytes_sent=0, bytes_received=0, seconds=0.0,
+                    latency=[0] * (len(self.buckets) + 1))
+            counts["requests"] += 1
+            counts["errors"] += 1 if failed else 0
+            counts["bytes_sent"] += event.bytes_sent
+            counts["bytes_received"] += event.bytes_received
+            counts["seconds"] += event.duration
+            counts["latency"][bisect.bisect_left(self.buckets, event.duration)] += 1
+
+    def stats(self):
+        """
+        Return a dict from "<method> <endpoint>" to that endpoint's counts.
+        Its "latency" is a list of (upper bound, requests) pairs, one per
+        bucket, with None as the bound of the last.
+        """
+        bounds = self.buckets + (None,)
+        with self._lock:
+            stats = dict()
+            for key, counts in self._endpoints.items():
+                counts = dict(counts)
+                counts["latency"] = zip(bounds, counts["latency"])
+                stats[key] = counts
+            return stats
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
@@ -1,5 +1,8 @@
 from geoserver.support import ResourceInfo, xml_property, write_string, bbox, \
     write_bbox, string_list, write_string_list, attribute_list, write_bool, url
+from geoserver.workspace import Workspace
+from os.path import splitext
+import urllib
 
 def md_link(node):
     """Extract a metadata link tuple from an xml node"""
@@ -55,10 +58,10 @@ class _ResourceBase(ResourceInfo):
             assert isinstance(name, basestring)
             assert workspace is not None
         else:
-            parts = href.split('/')
+            parts = [urllib.unquote(p) for p in href.split('/')]
             self._workspace_name = parts[parts.index('workspaces') + 1]
             self._store_name = parts[parts.index(self.url_part_stores) + 1]
-            name = parts[-1].replace('.xml','')
+            name = splitext(parts[-1])[0]
 
         self._href = href
         self.catalog = catalog
@@ -66,16 +69,19 @@ class _ResourceBase(ResourceInfo):
         self._store = store
         self.name = name
 
+    # A resource known only by its href already names its workspace and
+    # store, so build those from the names rather than looking them up
+
     @property
     def workspace(self):
         if not self._workspace:
-            self._workspace = self.catalog.get_workspace(self._workspace_name)
+            self._workspace = Workspace(self.catalog, self._workspace_name)
         return self._workspace
 
     @property
     def store(self):
         if not self._store:
-            self._store = self.catalog.get_store(self._store_name, self._workspace_name)
+            self._store = self.store_type(self.catalog, self.workspace, self._store_name)
         return self._store
 
     @property
@@ -92,6 +98,12 @@ class FeatureType(_ResourceBase):
     url_part_stores = 'datastores'
     url_part_types = 'featuretypes'
 
+    @property
+    def store_type(self):
+        # geoserver.store imports this module, so import it late
+        from geoserver.store import DataStore
+        return DataStore
+
     title = xml_property("title")
     abstract = xml_property("abstract")
     enabled = xml_property("enabled")
@@ -166,6 +178,11 @@ class Coverage(_ResourceBase):
     url_part_stores = 'coveragestores'
     url_part_types = 'coverages'
 
+    @property
+    def store_type(self):
+        from geoserver.store import CoverageStore
+        return CoverageStore
+
     title = xml_property("title")
     abstract = xml_property("abstract")
     enabled = xml_property("enabled")
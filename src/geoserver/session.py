@@ -0,0 +1,212 @@
+import copy
+import logging
+import types
+from xml.etree.ElementTree import TreeBuilder
+from geoserver.catalog import FailedRequestError
+from geoserver.summary import _Summary
+from geoserver.support import ResourceInfo
+
+logger = logging.getLogger("gsconfig.session")
+
+# Objects are saved in rounds, so that each round only depends on objects
+# saved in earlier ones; anything not listed here goes with the resources
+_RANKS = {
+    "workspace": 0,
+    "dataStore": 1,
+    "coverageStore": 1,
+    "featureType": 2,
+    "coverage": 2,
+    "layer": 3,
+    "layerGroup": 4
+}
+
+def _rank(obj):
+    return _RANKS.get(getattr(obj, "resource_type", None), 2)
+
+def _same(written, current):
+    """
+    Whether the element current, from an object's document, already says
+    everything the element written by one of its writers does.  Children
+    of current with tags that written lacks, such as atom links, are
+    ignored.
+    """
+    if current is None:
+        return False
+    if (written.text or "").strip() != (current.text or "").strip():
+        return False
+    for key, value in written.attrib.items():
+        if current.get(key) != value:
+            return False
+    tags = []
+    for child in written:
+        if child.tag not in tags:
+            tags.append(child.tag)
+    for tag in tags:
+        ours, theirs = written.findall(tag), current.findall(tag)
+        if len(ours) != len(theirs):
+            return False
+        if not all(_same(a, b) for a, b in zip(ours, theirs)):
+            return False
+    return True
+
+def _snapshot(obj):
+    """
+    A copy of obj's pending changes, deep enough that changes made in place
+    later on, such as updating a store's connection parameters, still show.
+    """
+    snapshot = dict()
+    for key, value in obj.dirty.items():
+        try:
+            # share the catalog rather than copy it along with its pools
+            snapshot[key] = copy.deepcopy(value, {id(obj.catalog): obj.catalog})
+        except (TypeError, copy.Error):
+            snapshot[key] = value
+    return snapshot
+
+def _drop_unchanged(obj):
+    """
+    Remove the pending changes of obj that would write what its document
+    already holds.  Objects that were never fetched keep all their changes.
+    """
+    if obj.dom is None:
+        return
+    for key, value in obj.dirty.items():
+        writer = obj.writers.get(key)
+        if writer is None:
+            continue
+        builder = TreeBuilder()
+        builder.start("changes", dict())
+        try:
+            writer(builder, value)
+        except Exception:
+            # leave it to the save to report
+            continue
+        builder.end("changes")
+        written = list(builder.close())
+        if len(written) == 1 and _same(written[0], obj.dom.find(written[0].tag)):
+            logger.debug("dropping unchanged %s of %s", key, obj.href)
+            del obj.dirty[key]
+
+class Session(object):
+    """
+    A unit of work over a catalog, used as a context manager:
+
+        with catalog.session() as s:
+            layer = s.get_layer("states")
+            layer.enabled = False
+            store = s.get_store("sf")
+            store.enabled = True
+
+    The session passes the catalog's get_*, iter_* and create_* methods
+    through and remembers every catalog object they return; track() adds
+    objects obtained some other way.  When the with block ends without an
+    exception, or when flush() is called, the changes made to those objects
+    are saved, and the new objects made by create_* are created.  Changes
+    that set a property to the value it already has are dropped, and
+    existing objects left with no changes are not saved at all.
+
+    The saves run concurrently, up to max_workers at a time, in rounds:
+    workspaces, then stores, then resources and styles, then layers, then
+    layer groups.  If any save in a round fails, later rounds are not
+    attempted and FailedRequestError is raised; ``results`` holds a
+    SaveResult for every save attempted.
+    """
+
+    def __init__(self, catalog, max_workers=None):
+        self.catalog = catalog
+        self.max_workers = max_workers
+        self.results = []
+        self._objects = []
+        self._seen = set()
+
+    def track(self, obj):
+        """
+        Include obj's changes in the next flush, and return obj.
+        """
+        if id(obj) not in self._seen:
+            self._seen.add(id(obj))
+            # constructors already put some properties, such as the name,
+            # in dirty; only what changes after this point counts
+            if isinstance(obj, _Summary):
+                baseline = obj._full if obj._full is not None else obj._build()
+            else:
+                baseline = obj
+            self._objects.append((obj, _snapshot(baseline)))
+        return obj
+
+    def _track_result(self, result):
+        if isinstance(result, (ResourceInfo, _Summary)):
+            return self.track(result)
+        elif isinstance(result, list):
+            for obj in result:
+                self._track_result(obj)
+        elif isinstance(result, types.GeneratorType):
+            return (self._track_result(obj) for obj in result)
+        return result
+
+    def __getattr__(self, name):
+        attr = getattr(self.catalog, name)
+        if not callable(attr) or not name.startswith(("get_", "iter_", "create_")):
+            return attr
+        def tracked(*args, **kwargs):
+            return self._track_result(attr(*args, **kwargs))
+        return tracked
+
+    def pending(self):
+        """
+        Return the tracked objects with changes to save, after dropping
+        the changes that would leave them as they are.
+        """
+        pending = []
+        for obj, baseline in self._objects:
+            if isinstance(obj, _Summary):
+                # a summary holds no changes until it has built its object
+                obj = obj._full
+            if obj is None:
+                continue
+            if obj.save_method == "POST":
+                # not created yet, so everything in it is a change
+                pending.append(obj)
+                continue
+            _drop_unchanged(obj)
+            if any(key not in baseline or baseline[key] != value
+                   for key, value in obj.dirty.items()):
+                pending.append(obj)
+        return pending
+
+    def flush(self):
+        """
+        Save every pending change, as described above.  Saved objects are
+        cleared, so they are fetched afresh the next time they are read, and
+        the session stops tracking the objects it created, so that a later
+        flush doesn't create them again.
+        """
+        rounds = dict()
+        for obj in self.pending():
+            rounds.setdefault(_rank(obj), []).append(obj)
+        for rank in sorted(rounds):
+            results = self.catalog.save_many(rounds[rank], self.max_workers)
+            self.results.extend(results)
+            failed = [r for r in results if r.error is not None]
+            created = set()
+            for result in results:
+                if result.error is None:
+                    if result.obj.save_method == "POST":
+                        created.add(id(result.obj))
+                    result.obj.clear()
+                    result.obj.dom = None
+            self._objects = [(obj, baseline) for (obj, baseline) in self._objects
+                if id(obj) not in created]
+            self._seen -= created
+            if failed:
+                raise FailedRequestError("%d of %d saves failed: %s" % (
+                    len(failed), len(results),
+                    "; ".join("%s: %s" % (r.obj.href, r.error) for r in failed)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        return False
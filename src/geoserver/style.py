@@ -1,5 +1,20 @@
 from geoserver.support import ResourceInfo, url, xml_property
 import geoserver.workspace as ws
+from os.path import splitext
+from urlparse import urlparse
+import urllib
+
+def style_from_url(catalog, href):
+    """
+    Build the Style, or Workspace_Style, that a REST href such as
+    .../styles/<name>.xml or .../workspaces/<ws>/styles/<name>.xml points
+    to, without fetching it.
+    """
+    parts = [urllib.unquote(p) for p in urlparse(href).path.split('/')]
+    name = splitext(parts[-1])[0]
+    if len(parts) > 3 and parts[-4] == "workspaces":
+        return Workspace_Style(catalog, ws.Workspace(catalog, parts[-3]), name)
+    return Style(catalog, name)
 
 class Style(ResourceInfo):
     def __init__(self, catalog, name):
@@ -45,6 +60,7 @@ class Style(ResourceInfo):
         headers = { "Content-Type": "application/vnd.ogc.sld+xml" }
         self.catalog.http.request(
             self.body_href(), "PUT", body, headers)
+        self.catalog._invalidate(self.href)
 
 
 
@@ -0,0 +1,101 @@
+"""
+Compact stand-ins for the objects in a catalog listing.
+
+A listing names thousands of layers, resources or styles, most of which are
+only ever asked for their name.  The summaries here hold just that name and
+references to the objects they belong to, in __slots__, and build the full
+Layer, FeatureType, Coverage or Style the first time anything else is asked
+of them; from then on every attribute, read or written, is the full
+object's.  Catalog.save() and Catalog.delete() accept summaries wherever
+they accept the full objects, but isinstance checks against the model
+classes do not pass; use full() to get at the real object.
+"""
+
+from geoserver.layer import Layer
+from geoserver.resource import FeatureType
+from geoserver.style import Style, Workspace_Style
+
+def _intern(name):
+    # only byte strings can be interned; ElementTree returns those for
+    # ASCII text, which covers nearly all catalog names
+    return intern(name) if type(name) is str else name
+
+class _Summary(object):
+    __slots__ = ("catalog", "name", "_full")
+
+    def __init__(self, catalog, name):
+        object.__setattr__(self, "catalog", catalog)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "_full", None)
+
+    def _build(self):
+        raise NotImplementedError()
+
+    def full(self):
+        """
+        Return the full catalog object this summary stands for, building
+        it on the first call.
+        """
+        if self._full is None:
+            object.__setattr__(self, "_full", self._build())
+        return self._full
+
+    def __getattr__(self, attr):
+        # only called for attributes the summary doesn't hold itself
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.full(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.full(), attr, value)
+        if attr == "name":
+            object.__setattr__(self, "name", value)
+
+    def __repr__(self):
+        return "<%s %s>" % (type(self).__name__, self.name)
+
+class LayerSummary(_Summary):
+    __slots__ = ()
+
+    def __init__(self, catalog, name):
+        super(LayerSummary, self).__init__(catalog, _intern(name))
+
+    def _build(self):
+        return Layer(self.catalog, self.name)
+
+class ResourceSummary(_Summary):
+    """
+    A FeatureType or Coverage from a store's listing.  All the summaries
+    from one listing share the store and workspace objects.
+    """
+
+    __slots__ = ("workspace", "store", "resource_class")
+
+    def __init__(self, catalog, workspace, store, name, resource_class=FeatureType):
+        super(ResourceSummary, self).__init__(catalog, _intern(name))
+        object.__setattr__(self, "workspace", workspace)
+        object.__setattr__(self, "store", store)
+        object.__setattr__(self, "resource_class", resource_class)
+
+    @property
+    def resource_type(self):
+        return self.resource_class.resource_type
+
+    def _build(self):
+        return self.resource_class(self.catalog, self.workspace, self.store, self.name)
+
+class StyleSummary(_Summary):
+    """
+    A Style, or with a workspace a Workspace_Style, from a styles listing.
+    """
+
+    __slots__ = ("workspace",)
+
+    def __init__(self, catalog, name, workspace=None):
+        super(StyleSummary, self).__init__(catalog, _intern(name))
+        object.__setattr__(self, "workspace", workspace)
+
+    def _build(self):
+        if self.workspace is None:
+            return Style(self.catalog, self.name)
+        return Workspace_Style(self.catalog, self.workspace, self.name)
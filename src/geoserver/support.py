@@ -1,10 +1,11 @@
 import logging
 from xml.etree.ElementTree import TreeBuilder, tostring
-from tempfile import mkstemp
+from tempfile import mkstemp, NamedTemporaryFile, SpooledTemporaryFile
 import urllib
 import urlparse
-from zipfile import ZipFile
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
 import os
+import shutil
 
 logger = logging.getLogger("gsconfig.support")
 
@@ -172,7 +173,63 @@ class ResourceInfo(object):
         msg = tostring(builder.close())
         return msg
                 
-def prepare_upload_bundle(name, data):
+SPOOL_THRESHOLD = 16 * 1024 * 1024
+## The size up to which upload bundles are kept in memory rather than in a
+## temporary file.
+
+PRECOMPRESSED = frozenset(["ecw", "gif", "gz", "jp2", "jpeg", "jpg", "png", "sid", "zip"])
+## Extensions of formats that are already compressed, and which upload
+## bundles store as they are rather than deflate again.
+
+def _compress_type(ext, compression):
+    if compression is not None:
+        return compression
+    return ZIP_STORED if ext.lower() in PRECOMPRESSED else ZIP_DEFLATED
+
+def _bundle_member(zip_file, fname, stream, compress_type, threshold):
+    """Add stream, a path or a file-like object, to zip_file as fname
+    without holding more than threshold bytes of it in memory."""
+    if isinstance(stream, basestring):
+        zip_file.write(stream, fname, compress_type)
+        return
+    path = getattr(stream, "name", None)
+    if isinstance(path, basestring) and os.path.isfile(path) and stream.tell() == 0:
+        zip_file.write(path, fname, compress_type)
+        return
+    # zipfile only reads in blocks from named files, so copy large
+    # anonymous streams to one
+    head = stream.read(threshold + 1)
+    if len(head) <= threshold:
+        zip_file.writestr(fname, head, compress_type)
+        return
+    with NamedTemporaryFile() as copy:
+        copy.write(head)
+        del head
+        shutil.copyfileobj(stream, copy)
+        copy.flush()
+        zip_file.write(copy.name, fname, compress_type)
+
+def spooled_upload_bundle(name, data, compression=None, threshold=SPOOL_THRESHOLD):
+    """Like prepare_upload_bundle, but return the archive as a file-like
+    object, rewound and ready to upload, that stays in memory unless it grows
+    beyond threshold bytes.  Files are read in blocks rather than whole.
+    compression is ZIP_STORED or ZIP_DEFLATED for every member; by default
+    members in PRECOMPRESSED formats are stored and the others deflated.
+    Closing the archive releases its memory or temporary file."""
+    bundle = SpooledTemporaryFile(max_size=threshold)
+    zip_file = ZipFile(bundle, 'w', allowZip64=True)
+    try:
+        for ext, stream in data.iteritems():
+            _bundle_member(zip_file, "%s.%s" % (name, ext), stream,
+                _compress_type(ext, compression), threshold)
+        zip_file.close()
+    except:
+        bundle.close()
+        raise
+    bundle.seek(0)
+    return bundle
+
+def prepare_upload_bundle(name, data, compression=ZIP_STORED):
     """GeoServer's REST API uses ZIP archives as containers for file formats such
     as Shapefile and WorldImage which include several 'boxcar' files alongside
     the main data.  In such archives, GeoServer assumes that all of the relevant
@@ -180,15 +237,12 @@ def prepare_upload_bundle(name, data):
     the root of the ZIP archive.  This method produces a zip file that matches
     these expectations, based on a basename, and a dict of extensions to paths or
     file-like objects. The client code is responsible for deleting the zip
-    archive when it's done."""
+    archive when it's done.  compression is as for spooled_upload_bundle."""
     fd, path = mkstemp()
-    zip_file = ZipFile(path, 'w')
+    zip_file = ZipFile(path, 'w', allowZip64=True)
     for ext, stream in data.iteritems():
         fname = "%s.%s" % (name, ext)
-        if (isinstance(stream, basestring)):
-            zip_file.write(stream, fname)
-        else:
-            zip_file.writestr(fname, stream.read())
+        _bundle_member(zip_file, fname, stream, _compress_type(ext, compression), SPOOL_THRESHOLD)
     zip_file.close()
     os.close(fd)
     return path
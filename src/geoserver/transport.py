@@ -0,0 +1,735 @@
+import base64
+import httplib
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import Queue
+import zlib
+import httplib2
+from contextlib import contextmanager
+from email.utils import mktime_tz, parsedate_tz
+from geoserver.metrics import RequestEvent, RequestMetrics, endpoint
+from StringIO import StringIO
+from urlparse import parse_qs, urlparse
+
+logger = logging.getLogger("gsconfig.transport")
+
+# httplib2 decompresses response bodies before handing them back, so the
+# compressed size is counted as it comes off the connection.  The timeouts
+# for the request being sent, and the deadline of the operation it is part
+# of, are kept here too.
+_wire = threading.local()
+
+class DeadlineExceeded(socket.timeout):
+    """
+    Raised when a request is due to be sent, or still running, after the
+    deadline set with within_deadline() has passed.
+    """
+    pass
+
+@contextmanager
+def within_deadline(seconds):
+    """
+    Make the requests sent on this thread in the with block, and on the
+    threads that functions wrapped with carry_deadline() run on, raise
+    DeadlineExceeded once seconds have passed.  Requests still running
+    then have their socket timeouts cut short.  An inner deadline can only
+    shorten an outer one.
+    """
+    previous = getattr(_wire, "deadline", None)
+    end = time.time() + seconds
+    _wire.deadline = end if previous is None else min(previous, end)
+    try:
+        yield
+    finally:
+        _wire.deadline = previous
+
+def time_left():
+    """
+    The seconds left until this thread's deadline, or None if it has none.
+    """
+    end = getattr(_wire, "deadline", None)
+    return None if end is None else end - time.time()
+
+def carry_deadline(func):
+    """
+    Wrap func to run under the calling thread's deadline, on whichever
+    thread it ends up running.
+    """
+    end = getattr(_wire, "deadline", None)
+    if end is None:
+        return func
+    def carried(*args, **kwargs):
+        previous = getattr(_wire, "deadline", None)
+        _wire.deadline = end
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _wire.deadline = previous
+    return carried
+
+def _read_timeout():
+    read_timeout = getattr(_wire, "timeouts", (None, None))[1]
+    return read_timeout if read_timeout is not None else socket.getdefaulttimeout()
+
+def _open(connection, connect):
+    connection.timeout = getattr(_wire, "timeouts", (None, None))[0]
+    connect(connection)
+    connection.sock.settimeout(_read_timeout())
+
+def _resume(connection):
+    # a kept-alive connection still has the timeout of its last request
+    if connection.sock is not None:
+        connection.sock.settimeout(_read_timeout())
+
+class _TimedHTTPConnection(httplib2.HTTPConnectionWithTimeout):
+    def connect(self):
+        _open(self, httplib2.HTTPConnectionWithTimeout.connect)
+
+    def request(self, *args, **kwargs):
+        _resume(self)
+        httplib2.HTTPConnectionWithTimeout.request(self, *args, **kwargs)
+
+class _TimedHTTPSConnection(httplib2.HTTPSConnectionWithTimeout):
+    def connect(self):
+        _open(self, httplib2.HTTPSConnectionWithTimeout.connect)
+
+    def request(self, *args, **kwargs):
+        _resume(self)
+        httplib2.HTTPSConnectionWithTimeout.request(self, *args, **kwargs)
+
+class _CountingResponse(httplib.HTTPResponse):
+    def read(self, amt=None):
+        data = httplib.HTTPResponse.read(self, amt)
+        _wire.received = getattr(_wire, "received", 0) + len(data)
+        return data
+
+class _CountingHTTPConnection(_TimedHTTPConnection):
+    response_class = _CountingResponse
+
+class _CountingHTTPSConnection(_TimedHTTPSConnection):
+    response_class = _CountingResponse
+
+_CONNECTION_TYPES = {
+    "http": _CountingHTTPConnection,
+    "https": _CountingHTTPSConnection
+}
+
+def gzip_compress(data, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+def body_length(body):
+    """
+    Return the number of bytes left to read from the file-like object
+    body, or None if that can't be known without reading it.
+    """
+    # seek and tell rather than fstat, which would make a spooled
+    # temporary file roll over to disk
+    try:
+        position = body.tell()
+        body.seek(0, os.SEEK_END)
+        end = body.tell()
+        body.seek(position)
+        return end - position
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+class StreamingResponse(object):
+    """
+    A response whose body is read off the connection as it is consumed,
+    decoding gzip or deflate on the fly, rather than all at once.  It is a
+    file-like object, as iterparse expects, and owns its connection: close
+    it, or use it as a context manager, when done.
+    """
+
+    block_size = 65536
+
+    def __init__(self, pool, connection, response):
+        self.status = response.status
+        self.reason = response.reason
+        self._pool = pool
+        self._connection = connection
+        self._response = response
+        encoding = (response.getheader("content-encoding") or "").lower()
+        if encoding in ("gzip", "x-gzip"):
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._decoder = zlib.decompressobj()
+        else:
+            self._decoder = None
+        self._pending = ""
+        self._eof = False
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def _fill(self, size):
+        while len(self._pending) < size and not self._eof:
+            data = self._response.read(self.block_size)
+            if data:
+                self._pool._count(bytes_received=len(data))
+                if self._decoder is not None:
+                    data = self._decoder.decompress(data)
+            else:
+                self._eof = True
+                if self._decoder is not None:
+                    data = self._decoder.flush()
+            self._pending += data
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = iter(lambda: self.read(self.block_size), "")
+            return "".join(chunks)
+        self._fill(size)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        self._pool._count(bytes_received_decoded=len(data))
+        return data
+
+    def close(self):
+        self._response.close()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+_UNAVAILABLE = (502, 503, 504)
+## The statuses of a GeoServer, or of the proxy in front of it, that is
+## starting, restarting or overloaded.
+
+def _repeatable(uri):
+    """
+    Whether uploading to uri twice leaves GeoServer as uploading once does.
+    Data uploads (file.*, url.*, external.*) add to their store unless
+    asked to overwrite it.
+    """
+    parts = urlparse(uri)
+    if not parts.path.rsplit("/", 1)[-1].startswith(("file.", "url.", "external.")):
+        return True
+    return "overwrite" in parse_qs(parts.query).get("update", [])
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while the circuit breaker is open.
+    """
+    pass
+
+def _retry_after(response):
+    """
+    The seconds the Retry-After header of response asks to wait, or None.
+    """
+    if response is None:
+        return None
+    if hasattr(response, "getheader"):
+        value = response.getheader("retry-after")
+    else:
+        value = response.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, mktime_tz(date) - time.time())
+
+class RetryPolicy(object):
+    """
+    When and how long to wait before sending a request again.
+
+    Requests with one of the idempotent ``methods`` are retried up to
+    ``retries`` times after a connection error or a response with one of
+    the ``statuses`` GeoServer (or the proxy in front of it) answers with
+    while it is starting or overloaded.  The n-th retry waits a random time
+    of up to ``backoff`` * 2 ** n seconds, capped at ``max_backoff``
+    ("full jitter", so that clients that failed together don't all come
+    back together), or, if the response has a Retry-After header, as long
+    as that asks for, again capped at ``max_backoff``.  PUTs that upload
+    data to a store are only retried if they overwrite it, as GeoServer
+    otherwise adds the data again.
+    """
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30.0,
+            statuses=_UNAVAILABLE,
+            methods=("GET", "HEAD", "PUT", "DELETE", "OPTIONS")):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(methods)
+
+    def allows(self, method, attempt):
+        """
+        Whether a request with method may be sent again after attempt
+        (counting from 0) failed.
+        """
+        return method.upper() in self.methods and attempt < self.retries
+
+    def delay(self, attempt, response=None):
+        """
+        The seconds to wait after attempt failed with response, or with a
+        connection error if response is None.
+        """
+        requested = _retry_after(response)
+        if requested is not None:
+            return min(requested, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+class CircuitBreaker(object):
+    """
+    Stops sending requests to a GeoServer that keeps failing.
+
+    After ``failures`` consecutive failures (connection errors, or the
+    statuses of the pool's RetryPolicy, 502, 503 and 504 by default) the
+    breaker opens, and requests fail at once with CircuitOpenError.  Once
+    ``reset_after`` seconds have passed, a single request is let through:
+    if it succeeds the breaker closes again, if it fails the breaker stays
+    open for another ``reset_after`` seconds, and if it ends some other
+    way, say because a deadline passed before it was sent, the next request
+    is let through instead.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failures=5, reset_after=30.0):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self.opened = 0
+        self._failed = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before(self):
+        """
+        Raise CircuitOpenError unless a request may be sent now.  Returns
+        True if the request is the trial that decides whether the breaker
+        closes again; the caller must then report its outcome with
+        succeeded(), failed() or released().
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN and time.time() - self._opened_at >= self.reset_after:
+                self.state = self.HALF_OPEN
+                return True
+            raise CircuitOpenError("GeoServer failed %d times in a row; not retrying for %.0fs" % (
+                self._failed, max(0, self._opened_at + self.reset_after - time.time())))
+
+    def succeeded(self):
+        with self._lock:
+            self._failed = 0
+            self.state = self.CLOSED
+
+    def released(self):
+        """
+        End a trial that neither succeeded nor failed, letting the next
+        request through as the trial instead.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._opened_at = time.time() - self.reset_after
+
+    def failed(self):
+        with self._lock:
+            self._failed += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self._failed >= self.failures):
+                if self.state == self.CLOSED:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.time()
+                logger.warning("GeoServer failed %d times in a row, failing fast for %.0fs",
+                    self._failed, self.reset_after)
+
+class HttpPool(object):
+    """
+    A thread-safe stand-in for httplib2.Http.
+
+    httplib2.Http objects keep their connections alive between requests but
+    must not be shared between threads, so the pool hands out one Http
+    object per in-flight request.  At most ``size`` Http objects are
+    created, which also bounds the number of concurrent connections per
+    host; callers beyond that wait for an object to be returned.  Http
+    objects are created lazily, so an idle pool holds no sockets.
+
+    Responses are requested with gzip or deflate encoding and decoded
+    transparently.  With ``compress_requests`` set, string request bodies of
+    at least ``compress_threshold`` bytes are sent gzip-compressed too;
+    GeoServer only accepts those if it is configured to decode them.  The
+    pool counts the bytes it moves on the wire and before encoding, see
+    stats().
+
+    With a RetryPolicy as ``retry``, requests that fail in passing are sent
+    again, and with a CircuitBreaker as ``circuit_breaker``, requests fail
+    fast while GeoServer is down.  Neither is used by default.
+
+    ``timeout`` limits, in seconds, how long connecting and each read from
+    the connection may take before socket.timeout is raised; a (connect,
+    read) pair sets the two separately.  The default of None waits as long
+    as the socket module's default timeout.  Under a deadline (see
+    within_deadline) both are capped at the time left.
+
+    Every request is reported to the pool's listeners (see
+    geoserver.metrics), starting with its own RequestMetrics, ``metrics``,
+    followed by those given as ``listeners`` or to add_listener().
+    """
+
+    def __init__(self, service_url, username, password, size=4,
+            disable_ssl_certificate_validation=False, compress_requests=False,
+            compress_threshold=16384, retry=None, circuit_breaker=None, timeout=None,
+            listeners=()):
+        if size < 1:
+            raise ValueError("HttpPool size must be at least 1, not %r" % size)
+        self.service_url = service_url
+        self.username = username
+        self.password = password
+        self.size = size
+        self.disable_ssl_certificate_validation = disable_ssl_certificate_validation
+        self.compress_requests = compress_requests
+        self.compress_threshold = compress_threshold
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout
+        self.metrics = RequestMetrics()
+        self._listeners = [self.metrics] + list(listeners)
+        self._idle = Queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._counters = dict(requests=0,
+            bytes_sent=0, bytes_sent_decoded=0,
+            bytes_received=0, bytes_received_decoded=0,
+            retries=0, retries_exhausted=0, circuit_rejected=0,
+            deadlines_exceeded=0)
+
+    def _connect(self):
+        http = httplib2.Http(
+            disable_ssl_certificate_validation=self.disable_ssl_certificate_validation)
+        http.add_credentials(self.username, self.password)
+        netloc = urlparse(self.service_url).netloc
+        http.authorizations.append(
+                httplib2.BasicAuthentication(
+                        (self.username, self.password),
+                        netloc,
+                        self.service_url,
+                        {},
+                        None,
+                        None,
+                        http
+                        ))
+        return http
+
+    def _checkout(self):
+        try:
+            # most recently used first, so its connection is likely still open
+            return self._idle.get_nowait()
+        except Queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                logger.debug("opening HTTP client %d of %d", self._created, self.size)
+                return self._connect()
+        return self._idle.get()
+
+    def _checkin(self, http):
+        self._idle.put(http)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        """
+        Perform a request with one of the pooled clients.  Takes and returns
+        the same arguments as httplib2.Http.request.
+        """
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip, deflate")
+        decoded_size = len(body) if isinstance(body, basestring) else 0
+        if (self.compress_requests and isinstance(body, str)
+                and len(body) >= self.compress_threshold):
+            body = gzip_compress(body)
+            headers["Content-Encoding"] = "gzip"
+        kwargs.setdefault("connection_type", _CONNECTION_TYPES.get(urlparse(uri).scheme))
+
+        def send():
+            http = self._checkout()
+            try:
+                _wire.received = 0
+                response, content = http.request(uri, method, body, headers, **kwargs)
+            finally:
+                self._checkin(http)
+            self._count(requests=1,
+                bytes_sent=len(body) if isinstance(body, basestring) else 0,
+                bytes_sent_decoded=decoded_size,
+                bytes_received=_wire.received,
+                bytes_received_decoded=len(content))
+            return response, content
+        # httplib2 reads file bodies to the end, so only strings can be resent
+        resendable = body is None or isinstance(body, basestring)
+        return self._attempt(method, uri, send, resendable)
+
+    def stream(self, uri, headers=None):
+        """
+        GET uri and return a StreamingResponse as soon as the response
+        headers are in.  The body is read over a connection of its own,
+        outside the pool, so a slow consumer holds up no other requests.
+        """
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip, deflate")
+
+        def send():
+            connection, path = self._dedicated(uri, headers)
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+            except:
+                connection.close()
+                raise
+            self._count(requests=1)
+            return StreamingResponse(self, connection, response), None
+        return self._attempt("GET", uri, send)[0]
+
+    def upload(self, uri, method, body, headers=None, progress=None, block_size=65536):
+        """
+        Send body, a string or a file-like object read from its current
+        position, to uri, reading and sending block_size bytes at a time so
+        that memory use doesn't depend on the size of the body.  Bodies of a
+        length known in advance, like regular files, are sent with a
+        Content-Length, others with chunked transfer encoding.  If given,
+        progress is called after each block with the bytes sent so far, the
+        total (or None) and the average rate in bytes per second.  Returns
+        an (httplib2.Response, content) pair like request().
+        """
+        if isinstance(body, basestring):
+            body = StringIO(body)
+        headers = dict(headers or {})
+        total = body_length(body)
+        if total is None:
+            headers["Transfer-Encoding"] = "chunked"
+        else:
+            headers["Content-Length"] = str(total)
+        # a body of known length is seekable, so a retry can start it over
+        origin = body.tell() if total is not None else None
+
+        def send():
+            if origin is not None:
+                body.seek(origin)
+            connection, path = self._dedicated(uri, headers)
+            sent = wire = 0
+            start = time.time()
+            try:
+                connection.putrequest(method, path, skip_accept_encoding=True)
+                for name, value in headers.items():
+                    connection.putheader(name, value)
+                connection.endheaders()
+                while True:
+                    block = body.read(block_size)
+                    if total is None:
+                        frame = "%x\r\n%s\r\n" % (len(block), block)
+                        connection.send(frame)
+                        wire += len(frame)
+                    elif block:
+                        connection.send(block)
+                        wire += len(block)
+                    if not block:
+                        break
+                    sent += len(block)
+                    if progress is not None:
+                        elapsed = time.time() - start
+                        progress(sent, total, sent / elapsed if elapsed > 0 else 0.0)
+                response = connection.getresponse()
+                content = response.read()
+            finally:
+                connection.close()
+            self._count(requests=1, bytes_sent=wire, bytes_sent_decoded=sent,
+                bytes_received=len(content), bytes_received_decoded=len(content))
+            logger.debug("%s %s sent %d bytes in %.2fs", method, uri, sent, time.time() - start)
+            return httplib2.Response(response), content
+        return self._attempt(method, uri, send, origin is not None and _repeatable(uri))
+
+    def _attempt(self, method, uri, send, resendable=True):
+        """
+        Call send, which makes one request and returns a (response,
+        content) pair, as often as the retry policy and the circuit breaker
+        allow.  Returns the last pair, or raises the last connection error.
+        """
+        retry, breaker = self.retry, self.circuit_breaker
+        attempt = 0
+        while True:
+            trial = False
+            if breaker is not None:
+                try:
+                    trial = breaker.before()
+                except CircuitOpenError:
+                    self._count(circuit_rejected=1)
+                    raise
+            try:
+                _wire.timeouts = self._timeouts(method, uri)
+                response, content = self._observed(method, uri, send)
+            except DeadlineExceeded:
+                # from _timeouts, before anything was sent, and counted there;
+                # it is a socket.timeout, so it must not reach the clause below
+                if trial:
+                    breaker.released()
+                raise
+            except (socket.error, httplib.HTTPException), e:
+                if isinstance(e, socket.timeout) and time_left() is not None and time_left() <= 0:
+                    self._count(deadlines_exceeded=1)
+                    if trial:
+                        breaker.released()
+                    raise DeadlineExceeded("deadline passed during %s %s" % (method, uri))
+                if breaker is not None:
+                    breaker.failed()
+                if retry is None or not resendable or not retry.allows(method, attempt):
+                    if retry is not None and attempt:
+                        self._count(retries_exhausted=1)
+                    raise
+                delay = retry.delay(attempt)
+                logger.info("%s %s failed (%s), retrying in %.2fs", method, uri, e, delay)
+            except:
+                # an error that says nothing about the server, like a name
+                # lookup failing
+                if trial:
+                    breaker.released()
+                raise
+            else:
+                transient = retry is not None and response.status in retry.statuses
+                if breaker is not None:
+                    if transient or response.status in _UNAVAILABLE:
+                        breaker.failed()
+                    else:
+                        breaker.succeeded()
+                if not transient:
+                    return response, content
+                if not resendable or not retry.allows(method, attempt):
+                    if attempt:
+                        self._count(retries_exhausted=1)
+                    return response, content
+                delay = retry.delay(attempt, response)
+                if hasattr(response, "close"):
+                    response.close()
+                logger.info("%s %s answered %d, retrying in %.2fs",
+                    method, uri, response.status, delay)
+            remaining = time_left()
+            if remaining is not None and remaining <= delay:
+                self._count(deadlines_exceeded=1)
+                raise DeadlineExceeded("deadline would pass before %s %s could be retried" % (method, uri))
+            self._count(retries=1)
+            retry.sleep(delay)
+            attempt += 1
+
+    def add_listener(self, listener):
+        """
+        Report every request from now on to listener, a RequestListener.
+        """
+        # replaced rather than changed, so threads notifying never see a
+        # list in the middle of a change
+        self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener):
+        self._listeners = [l for l in self._listeners if l is not listener]
+
+    def _notify(self, hook, event):
+        for listener in self._listeners:
+            try:
+                getattr(listener, hook)(event)
+            except Exception:
+                logger.exception("%s listener %r failed", hook, listener)
+
+    def _observed(self, method, uri, send):
+        """
+        Call send, reporting the request it makes to the listeners.
+        """
+        template = endpoint(self.service_url, uri)
+        call = _wire.call = dict(bytes_sent=0, bytes_received=0)
+        self._notify("request_started",
+            RequestEvent(method, uri, template, None, 0, 0, None, None))
+        start = time.time()
+        status = error = None
+        try:
+            response, content = send()
+            status = response.status
+            return response, content
+        except Exception, e:
+            error = e
+            raise
+        finally:
+            # the body of a streamed response is read after this, and counted
+            # only in the pool's totals
+            _wire.call = None
+            self._notify("request_finished", RequestEvent(method, uri, template, status,
+                call["bytes_sent"], call["bytes_received"],
+                time.time() - start, error))
+
+    def _timeouts(self, method, uri):
+        """
+        The (connect, read) timeouts for the next request, capped at the
+        time left before the deadline, if any.
+        """
+        if isinstance(self.timeout, tuple):
+            connect, read = self.timeout
+        else:
+            connect = read = self.timeout
+        remaining = time_left()
+        if remaining is None:
+            return connect, read
+        if remaining <= 0:
+            self._count(deadlines_exceeded=1)
+            raise DeadlineExceeded("deadline passed before %s %s" % (method, uri))
+        return (remaining if connect is None else min(connect, remaining),
+            remaining if read is None else min(read, remaining))
+
+    def _dedicated(self, uri, headers):
+        """
+        Open a connection outside the pool for uri, and add the headers to
+        authenticate on it.  Returns the connection and the request path.
+        """
+        # a dedicated connection can't take part in httplib2's auth
+        # handshake, so authenticate preemptively
+        credentials = "%s:%s" % (self.username, self.password)
+        if isinstance(credentials, unicode):
+            credentials = credentials.encode("utf-8")
+        headers["Authorization"] = "Basic " + base64.b64encode(credentials)
+
+        parts = urlparse(uri)
+        if parts.scheme == "https":
+            connection = _TimedHTTPSConnection(parts.hostname, parts.port,
+                disable_ssl_certificate_validation=self.disable_ssl_certificate_validation)
+        else:
+            connection = _TimedHTTPConnection(parts.hostname, parts.port)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        return connection, path
+
+    def _count(self, **amounts):
+        # also the bytes of the request being reported to the listeners, if
+        # it is still in flight
+        call = getattr(_wire, "call", None)
+        if call is not None:
+            for name in ("bytes_sent", "bytes_received"):
+                call[name] += amounts.get(name, 0)
+        with self._lock:
+            for name, amount in amounts.items():
+                self._counters[name] += amount
+
+    def stats(self):
+        """
+        Return the request count and the bytes sent and received, both as
+        they went over the wire and as they were before encoding / after
+        decoding, how many requests were retried, how many gave up after
+        retrying, how many the circuit breaker turned away and how many
+        were stopped by a deadline.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        if self.circuit_breaker is not None:
+            stats["circuit_opened"] = self.circuit_breaker.opened
+        return stats
@@ -0,0 +1,65 @@
+import unittest
+from geoserver.asynccatalog import AsyncCatalog
+from geoserver.catalog import Catalog, FailedRequestError
+from geoserver.layer import Layer
+from test.standin import StandInGeoServer
+
+REST = "/geoserver/rest"
+
+class AsyncCatalogTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            REST + "/workspaces.xml": "<workspaces><workspace><name>sf</name></workspace>"
+                "<workspace><name>topp</name></workspace></workspaces>",
+            REST + "/workspaces/sf/datastores.xml":
+                "<dataStores><dataStore><name>roads</name></dataStore></dataStores>",
+            REST + "/workspaces/topp/datastores.xml": "<dataStores><dataStore><name>parks</name>"
+                "</dataStore><dataStore><name>states</name></dataStore></dataStores>",
+            REST + "/workspaces/sf/coveragestores.xml": "<coverageStores/>",
+            REST + "/workspaces/topp/coveragestores.xml": "<coverageStores/>",
+            REST + "/workspaces/sf/datastores/roads/featuretypes.xml":
+                "<featureTypes><featureType><name>streets</name></featureType></featureTypes>",
+            REST + "/workspaces/topp/datastores/parks/featuretypes.xml": "<featureTypes/>",
+            REST + "/workspaces/topp/datastores/states/featuretypes.xml":
+                "<featureTypes><featureType><name>states</name></featureType>"
+                "<featureType><name>counties</name></featureType></featureTypes>",
+            REST + "/layers.xml": "<layers><layer><name>states</name></layer></layers>",
+            REST + "/styles.xml": "<styles><style><name>line</name></style></styles>",
+            REST + "/workspaces/topp/styles.xml": "<styles><style><name>dots</name></style></styles>"
+        }).start()
+        # the first workspace answers last, so its results arrive last
+        self.server.delays[REST + "/workspaces/sf/datastores.xml"] = 0.2
+        self.server.delays[REST + "/workspaces/sf/datastores/roads/featuretypes.xml"] = 0.2
+        self.cat = AsyncCatalog(Catalog(self.server.rest_url, pool_size=4), workers=4)
+
+    def tearDown(self):
+        self.cat.close()
+        self.server.stop()
+
+    def testFanOutKeepsCatalogOrder(self):
+        stores = self.cat.get_stores().get(5)
+        self.assertEqual([("sf", "roads"), ("topp", "parks"), ("topp", "states")],
+            [(s.workspace.name, s.name) for s in stores])
+        resources = self.cat.get_resources().get(5)
+        self.assertEqual(["streets", "states", "counties"], [r.name for r in resources])
+
+    def testStylesByWorkspace(self):
+        self.assertEqual(["line"], [s.name for s in self.cat.get_styles().get(5)])
+        styles = self.cat.get_styles("topp").get(5)
+        self.assertEqual([("topp", "dots")], [(s.workspace.name, s.name) for s in styles])
+
+    def testErrorsSurfaceFromGet(self):
+        self.server.errors[REST + "/layers/states.xml"] = 500
+        layer = Layer(self.cat.catalog, "states")
+        layer.enabled = False
+        result = self.cat.save(layer)
+        self.assertRaises(FailedRequestError, result.get, 5)
+
+    def testCloseWaitsForOutstandingCalls(self):
+        results = [self.cat.get_stores("sf"), self.cat.get_layers()]
+        self.cat.close()
+        self.assertTrue(all(r.ready() for r in results))
+        self.assertEqual(["roads"], [s.name for s in results[0].get()])
+
+if __name__ == "__main__":
+    unittest.main()
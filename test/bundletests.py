@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
+from geoserver.support import prepare_upload_bundle, spooled_upload_bundle
+
+class BundleTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.shp = os.path.join(self.tmpdir, "roads.shp")
+        with open(self.shp, "wb") as f:
+            f.write("shape" * 20000)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def data(self):
+        return {"shp": self.shp, "dbf": StringIO("attributes" * 100), "png": StringIO("\x89PNG")}
+
+    def members(self, archive):
+        zip_file = ZipFile(archive)
+        return dict((info.filename, (info.compress_type, zip_file.read(info.filename)))
+            for info in zip_file.infolist())
+
+    def testSmallBundleStaysInMemory(self):
+        bundle = spooled_upload_bundle("roads", self.data())
+        self.assertFalse(bundle._rolled)
+        self.assertEqual({
+            "roads.shp": (ZIP_DEFLATED, "shape" * 20000),
+            "roads.dbf": (ZIP_DEFLATED, "attributes" * 100),
+            "roads.png": (ZIP_STORED, "\x89PNG")
+        }, self.members(bundle))
+
+    def testLargeBundleSpillsToDisk(self):
+        data = self.data()
+        data["dbf"] = StringIO("attributes" * 1000)
+        bundle = spooled_upload_bundle("roads", data, ZIP_STORED, threshold=4096)
+        self.assertTrue(bundle._rolled)
+        members = self.members(bundle)
+        self.assertEqual((ZIP_STORED, "attributes" * 1000), members["roads.dbf"])
+        self.assertEqual(100000, len(members["roads.shp"][1]))
+
+    def testPreparedBundleMatches(self):
+        path = prepare_upload_bundle("roads", self.data())
+        try:
+            members = self.members(path)
+        finally:
+            os.unlink(path)
+        self.assertEqual(self.members(spooled_upload_bundle("roads", self.data(), ZIP_STORED)),
+            members)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+from geoserver.cache import CatalogCache, CacheEntry, SQLiteCache
+from geoserver.catalog import Catalog
+from test.standin import StandInGeoServer
+
+def _layers(count):
+    return "<layers>%s</layers>" % "".join(
+        "<layer><name>layer_%d</name></layer>" % i for i in range(count))
+
+class RevalidationTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            "/geoserver/rest/layers.xml": _layers(500)
+        }).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def statuses(self):
+        return [status for (method, path, status) in self.server.requests]
+
+    def testUnchangedListingIsRevalidated(self):
+        cat = Catalog(self.server.rest_url, cache=CatalogCache(ttl=0))
+        self.assertEqual(500, len(cat.get_layers()))
+        first_listing = self.server.bytes_sent
+
+        for i in range(5):
+            self.assertEqual(500, len(cat.get_layers()))
+
+        self.assertEqual([200, 304, 304, 304, 304, 304], self.statuses())
+        self.assertEqual(first_listing, self.server.bytes_sent)
+        self.assertEqual(5, cat._cache.revalidations)
+
+    def testChangedListingIsRefetched(self):
+        cat = Catalog(self.server.rest_url, cache=CatalogCache(ttl=0))
+        cat.get_layers()
+        self.server.documents["/geoserver/rest/layers.xml"] = _layers(3)
+        self.assertEqual(3, len(cat.get_layers()))
+        self.assertEqual([200, 200], self.statuses())
+
+    def testFreshEntryIsNotRevalidated(self):
+        cat = Catalog(self.server.rest_url)
+        cat.get_layers()
+        cat.get_layers()
+        self.assertEqual(1, len(self.server.requests))
+
+class InvalidationTests(unittest.TestCase):
+    def setUp(self):
+        rest = "/geoserver/rest"
+        self.server = StandInGeoServer({
+            rest + "/workspaces.xml":
+                "<workspaces><workspace><name>sf</name></workspace></workspaces>",
+            rest + "/workspaces/sf/datastores.xml":
+                "<dataStores><dataStore><name>sf</name></dataStore></dataStores>",
+            rest + "/workspaces/sf/coveragestores.xml": "<coverageStores/>",
+            rest + "/workspaces/sf/datastores/sf.xml":
+                "<dataStore><name>sf</name><enabled>true</enabled></dataStore>",
+            rest + "/layers.xml": _layers(3)
+        }).start()
+        self.cat = Catalog(self.server.rest_url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def gets(self):
+        return [path[len("/geoserver/rest"):]
+                for (method, path, status) in self.server.requests if method == "GET"]
+
+    def testSaveDropsOnlyAffectedListings(self):
+        self.cat.get_layers()
+        ds = self.cat.get_store("sf", "sf")
+        self.assertTrue(ds.enabled)
+        ds.enabled = False
+        self.cat.save(ds)
+        del self.server.requests[:]
+
+        self.cat.get_layers()
+        self.cat.get_stores("sf")
+        self.cat.get_store("sf", "sf").fetch()
+        self.assertEqual(["/workspaces/sf/datastores.xml",
+                          "/workspaces/sf/datastores/sf.xml"], self.gets())
+
+    def testWorkspaceDeleteDropsEverythingBelowIt(self):
+        self.cat.get_layers()
+        sf = self.cat.get_workspace("sf")
+        self.cat.get_stores(sf)
+        self.cat.delete(sf)
+        del self.server.requests[:]
+
+        self.cat.get_layers()
+        self.cat.get_workspaces()
+        self.cat.get_stores(sf)
+        self.assertEqual(["/workspaces.xml",
+                          "/workspaces/sf/datastores.xml",
+                          "/workspaces/sf/coveragestores.xml"], self.gets())
+
+    def testUploadToTheDefaultWorkspaceDropsItsListings(self):
+        self.server.documents["/geoserver/rest/workspaces/default.xml"] = (
+            "<workspace><name>sf</name></workspace>")
+        cat = Catalog(self.server.rest_url, cache=CatalogCache(ttl=3600))
+        self.assertEqual(["sf"], [s.name for s in cat.get_stores("sf")])
+        self.server.documents["/geoserver/rest/workspaces/sf/datastores.xml"] = (
+            "<dataStores><dataStore><name>sf</name></dataStore>"
+            "<dataStore><name>parks</name></dataStore></dataStores>")
+        cat.create_featurestore("parks", {"shp": StringIO("shp"), "dbf": StringIO("dbf")},
+            overwrite=True)
+        self.assertEqual(["sf", "parks"], [s.name for s in cat.get_stores("sf")])
+
+class SQLiteCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            "/geoserver/rest/layers.xml": _layers(50)
+        }).start()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "catalog.sqlite")
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def testNewCatalogStartsWarm(self):
+        Catalog(self.server.rest_url, cache=SQLiteCache(self.path, ttl=60)).get_layers()
+        warm = Catalog(self.server.rest_url, cache=SQLiteCache(self.path, ttl=60))
+        self.assertEqual(50, len(warm.get_layers()))
+        self.assertEqual(1, len(self.server.requests))
+
+    def testStaleSnapshotIsRevalidated(self):
+        Catalog(self.server.rest_url, cache=SQLiteCache(self.path, ttl=0)).get_layers()
+        warm = Catalog(self.server.rest_url, cache=SQLiteCache(self.path, ttl=0))
+        self.assertEqual(50, len(warm.get_layers()))
+        statuses = [status for (method, path, status) in self.server.requests]
+        self.assertEqual([200, 304], statuses)
+
+    def testInvalidationReachesTheFile(self):
+        cache = SQLiteCache(self.path)
+        cache.put(CacheEntry("http://gs/rest/styles/a.xml", "<style/>"))
+        cache.put(CacheEntry("http://gs/rest/layers.xml", "<layers/>"))
+        cache.invalidate(["http://gs/rest/styles/"])
+        reopened = SQLiteCache(self.path)
+        self.assertEqual(None, reopened.get("http://gs/rest/styles/a.xml"))
+        self.assertEqual("<layers/>", reopened.get("http://gs/rest/layers.xml").content)
+
+class CatalogCacheTests(unittest.TestCase):
+    def testLeastRecentlyUsedIsEvicted(self):
+        cache = CatalogCache(max_entries=2)
+        cache.put(CacheEntry("a", "A"))
+        cache.put(CacheEntry("b", "B"))
+        cache.get("a")
+        cache.put(CacheEntry("c", "C"))
+        self.assertTrue("a" in cache)
+        self.assertFalse("b" in cache)
+        self.assertTrue("c" in cache)
+        self.assertEqual(1, cache.stats()["evictions"])
+
+    def testByteLimit(self):
+        cache = CatalogCache(max_entries=None, max_bytes=10)
+        cache.put(CacheEntry("a", "x" * 6))
+        cache.put(CacheEntry("b", "x" * 6))
+        self.assertEqual(1, len(cache))
+        self.assertEqual(6, cache.stats()["bytes"])
+        cache.put(CacheEntry("b", "x" * 2))
+        self.assertEqual(2, cache.stats()["bytes"])
+
+    def testTTLByPattern(self):
+        cache = CatalogCache(ttl=0, ttls=[(r"/styles\.xml$", 300)])
+        cache.put(CacheEntry("http://gs/rest/styles.xml", "<styles/>"))
+        cache.put(CacheEntry("http://gs/rest/layers.xml", "<layers/>"))
+        self.assertTrue(cache.get("http://gs/rest/styles.xml").is_fresh())
+        self.assertFalse(cache.get("http://gs/rest/layers.xml").is_fresh())
+        cache.get("http://gs/rest/workspaces.xml")
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(2, cache.misses)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+from zipfile import ZipFile
+from geoserver.catalog import Catalog, ConflictingDataError
+from geoserver.ingest import IngestItem
+from test.standin import StandInGeoServer
+
+class BulkIngestTests(unittest.TestCase):
+    def setUp(self):
+        rest = "/geoserver/rest"
+        self.server = StandInGeoServer({
+            rest + "/workspaces.xml":
+                "<workspaces><workspace><name>sf</name></workspace></workspaces>",
+            rest + "/workspaces/default.xml": "<workspace><name>sf</name></workspace>",
+            rest + "/workspaces/sf/datastores.xml":
+                "<dataStores><dataStore><name>roads</name></dataStore></dataStores>",
+            rest + "/workspaces/sf/coveragestores.xml": "<coverageStores/>",
+            rest + "/workspaces/sf/datastores/roads/featuretypes.xml": "<featureTypes/>",
+            rest + "/layers.xml": "<layers/>",
+            rest + "/styles.xml": "<styles/>"
+        }).start()
+        self.cat = Catalog(self.server.rest_url)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def uploads(self):
+        return dict((path[len("/geoserver/rest/workspaces/sf/"):], body)
+            for (path, encoding, body) in self.server.bodies)
+
+    def testPublishesEachItem(self):
+        shapefiles = [{"shp": self.write("s%d.shp" % i, "shape %d" % i),
+                       "dbf": self.write("s%d.dbf" % i, "table %d" % i)} for i in range(3)]
+        items = [IngestItem("streets_%d" % i, data, "sf") for i, data in enumerate(shapefiles)]
+        items.append(IngestItem("roads", shapefiles[0], "sf"))
+        items.append(dict(name="dem", data=self.write("dem.tif", "raster"), workspace="sf"))
+        items.append(dict(name="ortho", data="/data/ortho/", workspace="sf", external=True))
+
+        report = self.cat.bulk_ingest(items, workers=3, processes=2)
+
+        self.assertEqual(["streets_0", "streets_1", "streets_2", "roads", "dem", "ortho"],
+            [r.item.name for r in report.results])
+        self.assertEqual([None, None, None, ConflictingDataError, None, None],
+            [r.error and type(r.error) for r in report.results])
+        self.assertEqual(5, len(report.succeeded))
+        self.assertTrue(report.datasets_per_minute > 0)
+        self.assertEqual(6, report.results[4].bytes)
+
+        uploads = self.uploads()
+        self.assertEqual(set(["datastores/streets_0/file.shp", "datastores/streets_1/file.shp",
+            "datastores/streets_2/file.shp", "coveragestores/dem/file.geotiff",
+            "coveragestores/ortho/external.imagemosaic"]), set(uploads))
+        bundle = ZipFile(StringIO(uploads["datastores/streets_1/file.shp"]))
+        self.assertEqual("table 1", bundle.read("streets_1.dbf"))
+        self.assertEqual("raster", uploads["coveragestores/dem/file.geotiff"])
+
+    def testConflictsInTheDefaultWorkspaceAndWithinTheBatch(self):
+        shapefile = {"shp": self.write("s.shp", "shape"), "dbf": self.write("s.dbf", "table")}
+        items = [IngestItem("roads", shapefile),
+                 IngestItem("streets", shapefile, "sf"),
+                 IngestItem("streets", shapefile, "sf", overwrite=True),
+                 IngestItem("streets", shapefile)]
+
+        report = self.cat.bulk_ingest(items, processes=0)
+
+        self.assertEqual([ConflictingDataError, None, ConflictingDataError, ConflictingDataError],
+            [r.error and type(r.error) for r in report.results])
+        self.assertEqual(["/geoserver/rest/workspaces/sf/datastores/streets/file.shp"],
+            [path for (path, encoding, body) in self.server.bodies])
+        # only the store listings are needed to check the names
+        self.assertEqual(set(["/geoserver/rest/workspaces.xml",
+            "/geoserver/rest/workspaces/default.xml",
+            "/geoserver/rest/workspaces/sf/datastores.xml",
+            "/geoserver/rest/workspaces/sf/coveragestores.xml"]),
+            set(path for (method, path, status) in self.server.requests if method == "GET"))
+
+    def testEveryItemGetsAResult(self):
+        # the bundle is gone before upload() can remove it
+        self.cat.create_featurestore = lambda name, data, *args, **kwargs: os.unlink(data)
+        shapefile = {"shp": self.write("s.shp", "shape"), "dbf": self.write("s.dbf", "table")}
+        report = self.cat.bulk_ingest([IngestItem("streets", shapefile, "sf")], processes=1)
+        self.assertEqual(1, len(report.succeeded))
+
+if __name__ == "__main__":
+    unittest.main()
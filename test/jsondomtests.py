@@ -0,0 +1,120 @@
+import unittest
+from geoserver.catalog import Catalog
+from geoserver.jsondom import parse
+from geoserver.style import Style
+from geoserver.support import atom_link, bbox, key_value_pairs, string_list
+from test.standin import StandInGeoServer
+
+REST = "http://localhost:8080/geoserver/rest"
+
+FEATURE_TYPE = """{"featureType": {
+    "name": "states",
+    "nativeName": "states",
+    "namespace": {"name": "topp", "href": "%(rest)s/namespaces/topp.json"},
+    "title": "USA Population",
+    "keywords": {"string": ["census", "united", "boundaries"]},
+    "nativeBoundingBox": {"minx": -124.73142200000001, "maxx": -66.969849,
+        "miny": 24.955967, "maxy": 49.371735, "crs": "EPSG:4326"},
+    "latLonBoundingBox": {"minx": -124.731422, "maxx": -66.969849,
+        "miny": 24.955967, "maxy": 49.371735,
+        "crs": {"@class": "projected", "$": "EPSG:4326"}},
+    "enabled": true,
+    "metadata": {"entry": {"@key": "cachingEnabled", "$": "false"}},
+    "store": {"@class": "dataStore", "name": "states_shapefile",
+        "href": "%(rest)s/workspaces/topp/datastores/states_shapefile.json"},
+    "maxFeatures": 0
+}}""" % {"rest": REST}
+
+SLD = """<StyledLayerDescriptor xmlns="http://www.opengis.net/sld" version="1.0.0">
+  <NamedLayer><Name>line</Name>
+    <UserStyle><Name>line</Name><Title>A line</Title></UserStyle>
+  </NamedLayer>
+</StyledLayerDescriptor>"""
+
+class JSONElementTests(unittest.TestCase):
+    def setUp(self):
+        self.ft = parse(FEATURE_TYPE)
+
+    def testValues(self):
+        self.assertEqual("featureType", self.ft.tag)
+        self.assertEqual("states", self.ft.find("name").text)
+        self.assertEqual("true", self.ft.findtext("enabled"))
+        self.assertEqual("0", self.ft.findtext("maxFeatures"))
+        self.assertEqual(None, self.ft.find("abstract"))
+        self.assertEqual("none", self.ft.findtext("abstract", "none"))
+
+    def testListsAndNesting(self):
+        self.assertEqual(["census", "united", "boundaries"],
+            string_list(self.ft.find("keywords")))
+        self.assertEqual(3, len(self.ft.findall("keywords/string")))
+        self.assertEqual({"cachingEnabled": "false"},
+            key_value_pairs(self.ft.find("metadata")))
+
+    def testNumbersKeepTheirSpelling(self):
+        self.assertEqual(("-124.73142200000001", "-66.969849", "24.955967",
+            "49.371735", "EPSG:4326"), bbox(self.ft.find("nativeBoundingBox")))
+
+    def testAttributesAndText(self):
+        crs = self.ft.find("latLonBoundingBox/crs")
+        self.assertEqual("EPSG:4326", crs.text)
+        self.assertEqual({"class": "projected"}, crs.attrib)
+        self.assertEqual("dataStore", self.ft.find("store").get("class"))
+
+    def testHrefsAreAtomLinks(self):
+        store = self.ft.find("store")
+        self.assertEqual(REST + "/workspaces/topp/datastores/states_shapefile.json",
+            atom_link(store))
+        self.assertEqual(atom_link(store),
+            self.ft.find("store/{http://www.w3.org/2005/Atom}link").get("href"))
+
+    def testEmptyCollection(self):
+        self.assertEqual([], parse('{"dataStores": ""}').findall("dataStore"))
+
+    def testSingleItemCollection(self):
+        layers = parse('{"layers": {"layer": {"name": "states"}}}')
+        self.assertEqual(["states"], [l.findtext("name") for l in layers.findall("layer")])
+
+class JSONCatalogTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer().start()
+        rest = "/geoserver/rest"
+        self.server.documents.update({
+            rest + "/layers.json":
+                '{"layers": {"layer": [{"name": "states"}, {"name": "roads"}]}}',
+            rest + "/layers/states.json": """{"layer": {"name": "states",
+                "type": "VECTOR", "enabled": true,
+                "resource": {"@class": "featureType", "name": "states",
+                    "href": "%s/workspaces/topp/datastores/states_shapefile/featuretypes/states.json"}}}"""
+                % self.server.rest_url,
+            rest + "/workspaces/topp/datastores/states_shapefile/featuretypes/states.json":
+                FEATURE_TYPE,
+            rest + "/styles/line.sld": SLD
+        })
+        self.cat = Catalog(self.server.rest_url, wire_format="json")
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testReadsThroughJSON(self):
+        self.assertEqual(["states", "roads"], [l.name for l in self.cat.get_layers()])
+        layer = self.cat.get_layer("states")
+        self.assertEqual(True, layer.enabled)
+
+        resource = layer.resource
+        self.assertEqual("states", resource.name)
+        self.assertEqual("topp", resource.workspace.name)
+        self.assertEqual("states_shapefile", resource.store.name)
+        self.assertEqual(["census", "united", "boundaries"], resource.keywords)
+        self.assertTrue(all(path.endswith(".json") for (method, path, status)
+            in self.server.requests))
+
+    def testStyleBodiesStayXML(self):
+        style = Style(self.cat, "line")
+        self.assertEqual("A line", style.sld_title)
+        self.assertEqual("line", style.sld_name)
+
+    def testRejectsUnknownFormat(self):
+        self.assertRaises(ValueError, Catalog, self.server.rest_url, wire_format="yaml")
+
+if __name__ == "__main__":
+    unittest.main()
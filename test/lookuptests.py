@@ -0,0 +1,259 @@
+import threading
+import time
+import unittest
+from multiprocessing.dummy import DummyProcess
+from geoserver.catalog import AmbiguousRequestError, Catalog, ConflictingDataError, \
+    FailedRequestError
+from geoserver.index import CatalogIndex
+from geoserver.resource import FeatureType
+from geoserver.store import DataStore
+from geoserver.workspace import Workspace
+from test.standin import StandInGeoServer
+
+REST = "/geoserver/rest"
+
+def _link(href):
+    return ('<atom:link xmlns:atom="http://www.w3.org/2005/Atom" rel="alternate" '
+        'href="%s" type="application/xml"/>' % href)
+
+class LayerResourceTests(unittest.TestCase):
+    def setUp(self):
+        # GeoServer behind a proxy advertises the proxy's base URL
+        proxy = "https://maps.example.com/geoserver/rest"
+        self.server = StandInGeoServer({
+            REST + "/layers.xml": "<layers>%s</layers>" % "".join(
+                "<layer><name>roads_%d</name></layer>" % i for i in range(3)),
+            REST + "/workspaces/sf/datastores/sf/featuretypes/roads_1.xml":
+                "<featureType><name>roads_1</name><title>Roads</title></featureType>"
+        }).start()
+        for i in range(3):
+            self.server.documents[REST + "/layers/roads_%d.xml" % i] = (
+                "<layer><name>roads_%d</name><resource class=\"featureType\">"
+                "<name>roads_%d</name>%s</resource></layer>" % (i, i,
+                    _link("%s/workspaces/sf/datastores/sf/featuretypes/roads_%d.json" % (proxy, i))))
+        self.cat = Catalog(self.server.rest_url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testFilterByResourceBehindAProxy(self):
+        store = DataStore(self.cat, Workspace(self.cat, "sf"), "sf")
+        roads = FeatureType(self.cat, store.workspace, store, "roads_1")
+        self.assertEqual(["roads_1"], [l.name for l in self.cat.get_layers(roads)])
+        # the listing, then one GET per layer
+        self.assertEqual(4, len(self.server.requests))
+
+    def testResourceIsFetchedFromTheCatalog(self):
+        resource = self.cat.get_layer("roads_1").resource
+        self.assertEqual(("sf", "sf", "roads_1"),
+            (resource.workspace.name, resource.store.name, resource.name))
+        self.assertEqual("Roads", resource.title)
+        self.assertEqual(REST + "/workspaces/sf/datastores/sf/featuretypes/roads_1.xml",
+            self.server.requests[-1][1])
+
+def _catalog_documents():
+    """
+    Two workspaces, with a store named roads in each, and a layer and a
+    style, as the stand-in serves them.
+    """
+    documents = {
+        REST + "/workspaces.xml": "<workspaces><workspace><name>sf</name></workspace>"
+            "<workspace><name>topp</name></workspace></workspaces>",
+        REST + "/workspaces/sf/datastores.xml":
+            "<dataStores><dataStore><name>roads</name></dataStore></dataStores>",
+        REST + "/workspaces/topp/datastores.xml": "<dataStores><dataStore><name>roads</name>"
+            "</dataStore><dataStore><name>states</name></dataStore></dataStores>",
+        REST + "/workspaces/sf/datastores/roads/featuretypes.xml":
+            "<featureTypes><featureType><name>streets</name></featureType></featureTypes>",
+        REST + "/workspaces/topp/datastores/roads/featuretypes.xml": "<featureTypes/>",
+        REST + "/workspaces/topp/datastores/states/featuretypes.xml":
+            "<featureTypes><featureType><name>states</name></featureType></featureTypes>",
+        REST + "/workspaces/topp/datastores/states.xml":
+            "<dataStore><name>states</name><enabled>true</enabled></dataStore>",
+        REST + "/layers.xml": "<layers><layer><name>states</name></layer></layers>",
+        REST + "/styles.xml": "<styles><style><name>line</name></style></styles>"
+    }
+    for ws in ["sf", "topp"]:
+        documents[REST + "/workspaces/%s/coveragestores.xml" % ws] = "<coverageStores/>"
+    return documents
+
+class LayerStyleTests(unittest.TestCase):
+    def setUp(self):
+        layer = ("<layer><name>%s</name><defaultStyle><name>line</name></defaultStyle>"
+            "<styles><style><name>topp:dots</name></style>%s</styles></layer>")
+        self.server = StandInGeoServer({
+            REST + "/layers/roads.xml": layer % ("roads", ""),
+            REST + "/layers/states.xml": layer % ("states",
+                "<style><name>topp:fill</name>%s</style>" % _link(REST + "/workspaces/topp/styles/fill.xml")),
+            REST + "/styles.xml": "<styles><style><name>line</name></style></styles>",
+            REST + "/workspaces/topp/styles.xml":
+                "<styles><style><name>dots</name></style><style><name>fill</name></style></styles>"
+        }).start()
+        self.cat = Catalog(self.server.rest_url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testGlobalAndWorkspaceStyles(self):
+        for name in ["roads", "states"]:
+            layer = self.cat.get_layer(name)
+            self.assertEqual((None, "line"),
+                (getattr(layer.default_style, "workspace", None), layer.default_style.name))
+            self.assertEqual([("topp", "dots")], [(s.workspace.name, s.name) for s in layer.styles][:1])
+        self.assertEqual(("topp", "fill"), (layer.styles[1].workspace.name, layer.styles[1].name))
+        # the two layers, then each styles listing once; the linked style takes none
+        self.assertEqual(["/layers/roads.xml", "/styles.xml", "/workspaces/topp/styles.xml",
+            "/layers/states.xml"], [path[len(REST):] for (method, path, status) in self.server.requests])
+
+class IndexTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer(_catalog_documents()).start()
+        self.cat = Catalog(self.server.rest_url)
+        self.cat.build_index()
+        self.built = len(self.server.requests)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def requested(self):
+        return [path[len(REST):] for (method, path, status) in self.server.requests[self.built:]]
+
+    def testLookupsComeFromTheIndex(self):
+        self.assertEqual("topp", self.cat.get_workspace("topp").name)
+        self.assertEqual("topp", self.cat.get_store("states").workspace.name)
+        self.assertEqual("roads", self.cat.get_store("roads", "sf").name)
+        self.assertEqual("states", self.cat.get_resource("states", workspace="topp").store.name)
+        self.assertEqual("streets", self.cat.get_resource("streets").name)
+        self.assertEqual("states", self.cat.get_layer("states").name)
+        self.assertEqual("line", self.cat.get_style("line").name)
+        self.assertEqual([], self.requested())
+
+    def testMissesGoToREST(self):
+        self.assertEqual(None, self.cat.get_layer("rivers"))
+        self.assertEqual(["/layers/rivers.xml"], self.requested())
+
+    def testAmbiguousStore(self):
+        self.assertRaises(AmbiguousRequestError, self.cat.get_store, "roads")
+        self.cat.drop_index()
+        self.assertRaises(AmbiguousRequestError, self.cat.get_store, "roads")
+
+    def testLookupsReturnPrivateCopies(self):
+        store = self.cat.get_store("states", "topp")
+        store.enabled = False
+        again = self.cat.get_store("states", "topp")
+        self.assertFalse(store is again)
+        self.assertFalse("enabled" in again.dirty)
+
+    def testWritesForgetWhatTheyChange(self):
+        store = self.cat.get_store("states", "topp")
+        store.enabled = False
+        self.cat.save(store)
+        self.assertEqual([], self.cat._index.stores("states", "topp"))
+        self.assertEqual(1, len(self.cat._index.stores("roads", "topp")))
+        self.assertEqual(1, len(self.cat._index.layers("states")))
+
+    def testPartialBuild(self):
+        before = len(self.server.requests)
+        # a catalog of its own, so nothing comes from the cache
+        index = CatalogIndex(Catalog(self.server.rest_url)).build(["stores"])
+        self.assertEqual(3, len(index.stores("roads")) + len(index.stores("states")))
+        self.assertEqual([], index.resources("states"))
+        self.assertEqual(["/workspaces.xml"] + sorted("/workspaces/%s/%s.xml" % (ws, kind)
+                for ws in ["sf", "topp"] for kind in ["datastores", "coveragestores"]),
+            sorted(path[len(REST):] for (method, path, status) in self.server.requests[before:]))
+
+class DirectLookupTests(unittest.TestCase):
+    def setUp(self):
+        documents = _catalog_documents()
+        documents.update({
+            REST + "/workspaces/topp.xml": "<workspace><name>topp</name></workspace>",
+            REST + "/workspaces/default.xml": "<workspace><name>sf</name></workspace>",
+            REST + "/workspaces/topp/datastores/states/featuretypes/states.xml":
+                "<featureType><name>states</name></featureType>",
+            REST + "/layergroups/cities.xml": "<layerGroup><name>cities</name></layerGroup>"
+        })
+        self.server = StandInGeoServer(documents).start()
+        self.cat = Catalog(self.server.rest_url, direct_lookups=True)
+        self.topp = Workspace(self.cat, "topp")
+
+    def tearDown(self):
+        self.server.stop()
+
+    def requested(self):
+        return [(path[len(REST):], status) for (method, path, status) in self.server.requests]
+
+    def testWorkspace(self):
+        self.assertEqual("topp", self.cat.get_workspace("topp").name)
+        self.assertEqual(None, self.cat.get_workspace("nyc"))
+        self.assertEqual([("/workspaces/topp.xml", 200), ("/workspaces/nyc.xml", 404)],
+            self.requested())
+
+    def testStore(self):
+        self.assertEqual("states", self.cat.get_store("states", self.topp).name)
+        self.assertEqual([("/workspaces/topp/datastores/states.xml", 200)], self.requested())
+
+    def testMissingStore(self):
+        self.assertRaises(FailedRequestError, self.cat.get_store, "rivers", self.topp)
+        self.assertEqual([("/workspaces/topp/datastores/rivers.xml", 404),
+                          ("/workspaces/topp/coveragestores/rivers.xml", 404)], self.requested())
+
+    def testResource(self):
+        store = DataStore(self.cat, self.topp, "states")
+        self.assertEqual("states", self.cat.get_resource("states", store).name)
+        self.assertEqual(None, self.cat.get_resource("counties", store))
+        self.assertEqual([
+            ("/workspaces/topp/datastores/states/featuretypes/states.xml", 200),
+            ("/workspaces/topp/datastores/states/featuretypes/counties.xml", 404)],
+            self.requested())
+
+    def testLayerGroupNameCheck(self):
+        self.assertRaises(ConflictingDataError, self.cat.create_layergroup, "cities")
+        self.assertEqual("parks", self.cat.create_layergroup("parks").name)
+        self.assertEqual([("/layergroups/cities.xml", 200), ("/layergroups/parks.xml", 404)],
+            self.requested())
+
+    def testUploadOnlyChecksTheDefaultWorkspace(self):
+        self.cat.direct_lookups = False
+        self.cat.create_featurestore("roads", {"shp": "/data/roads.shp"}, external=True)
+        # then which workspace the upload's listings are cached under
+        self.assertEqual([("/workspaces/default/datastores.xml", 404),
+            ("/workspaces/default/datastores/roads/external.shp", 201),
+            ("/workspaces/default.xml", 200)], self.requested())
+
+class FanOutTests(unittest.TestCase):
+    def setUp(self):
+        names = ["ws_%d" % i for i in range(4)]
+        documents = {REST + "/workspaces.xml": "<workspaces>%s</workspaces>" % "".join(
+            "<workspace><name>%s</name></workspace>" % name for name in names)}
+        for i, name in enumerate(names):
+            documents[REST + "/workspaces/%s/datastores.xml" % name] = (
+                "<dataStores>%s</dataStores>" % "".join(
+                    "<dataStore><name>store_%d_%d</name></dataStore>" % (i, j) for j in range(3)))
+            documents[REST + "/workspaces/%s/coveragestores.xml" % name] = "<coverageStores/>"
+        self.server = StandInGeoServer(documents).start()
+        for name in names:
+            self.server.delays[REST + "/workspaces/%s/datastores.xml" % name] = 0.3
+        self.cat = Catalog(self.server.rest_url, workers=4)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testListingsRunConcurrentlyInOrder(self):
+        start = time.time()
+        stores = [(s.workspace.name, s.name) for s in self.cat.get_stores()]
+        elapsed = time.time() - start
+        # one after another, the four listings would take 1.2s
+        self.assertTrue(elapsed < 0.9, elapsed)
+        serial = Catalog(self.server.rest_url)
+        self.assertEqual([(s.workspace.name, s.name) for s in serial.get_stores()], stores)
+        self.assertEqual(12, len(stores))
+
+    def testWorkersStopWithTheCall(self):
+        for i in range(3):
+            Catalog(self.server.rest_url, workers=4).get_stores()
+        # the stand-in keeps a thread per kept-alive connection, so count
+        # only the pool's workers
+        self.assertEqual([], [t for t in threading.enumerate() if isinstance(t, DummyProcess)])
+
+if __name__ == "__main__":
+    unittest.main()
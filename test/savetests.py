@@ -0,0 +1,135 @@
+import unittest
+from geoserver.catalog import Catalog, FailedRequestError
+from test.standin import StandInGeoServer
+
+def _layers(count):
+    return "<layers>%s</layers>" % "".join(
+        "<layer><name>layer_%d</name></layer>" % i for i in range(count))
+
+class SaveManyTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            "/geoserver/rest/layers.xml": _layers(20)
+        }).start()
+        self.cat = Catalog(self.server.rest_url, pool_size=4)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def layers(self):
+        layers = self.cat.get_layers()
+        for layer in layers:
+            layer.enabled = False
+            layer.advertised = True
+        return layers
+
+    def testSavesEveryObject(self):
+        layers = self.layers()
+        results = self.cat.save_many(layers, max_workers=4)
+        self.assertEqual(layers, [r.obj for r in results])
+        self.assertEqual([None] * 20, [r.error for r in results])
+        puts = sorted(path for (method, path, status) in self.server.requests if method == "PUT")
+        self.assertEqual(sorted("/geoserver/rest/layers/layer_%d.xml" % i for i in range(20)), puts)
+
+    def testFailuresDontStopTheRest(self):
+        self.server.errors["/geoserver/rest/layers/layer_3.xml"] = 500
+        results = self.cat.save_many(self.layers(), max_workers=4)
+        failed = [r.obj.name for r in results if r.error is not None]
+        self.assertEqual(["layer_3"], failed)
+        self.assertTrue(isinstance(results[3].error, FailedRequestError))
+        self.assertEqual(None, results[3].response)
+        self.assertEqual(200, results[4].response[0].status)
+
+    def testCacheIsDroppedAfterwards(self):
+        self.cat.save_many(self.layers())
+        self.cat.get_layers()
+        gets = [path for (method, path, status) in self.server.requests if method == "GET"]
+        self.assertEqual(["/geoserver/rest/layers.xml"] * 2, gets)
+
+class SessionTests(unittest.TestCase):
+    def setUp(self):
+        rest = "/geoserver/rest"
+        self.server = StandInGeoServer({
+            rest + "/workspaces.xml":
+                "<workspaces><workspace><name>sf</name></workspace></workspaces>",
+            rest + "/workspaces/sf/datastores.xml":
+                "<dataStores><dataStore><name>sf</name></dataStore></dataStores>",
+            rest + "/workspaces/sf/coveragestores.xml": "<coverageStores/>",
+            rest + "/layergroups.xml": "<layerGroups/>",
+            rest + "/workspaces/sf/datastores/sf.xml":
+                "<dataStore><name>sf</name><enabled>true</enabled></dataStore>",
+            rest + "/layers/roads.xml":
+                "<layer><name>roads</name><enabled>true</enabled>"
+                "<defaultStyle><name>line</name><atom:link "
+                "xmlns:atom=\"http://www.w3.org/2005/Atom\" rel=\"alternate\" "
+                "href=\"http://localhost/geoserver/rest/styles/line.xml\"/></defaultStyle>"
+                "</layer>"
+        }).start()
+        self.cat = Catalog(self.server.rest_url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def writes(self):
+        return [(method, path[len("/geoserver/rest"):])
+                for (method, path, status) in self.server.requests if method != "GET"]
+
+    def testSavesInDependencyOrder(self):
+        with self.cat.session() as s:
+            layer = s.get_layer("roads")
+            store = s.get_store("sf", "sf")
+            layer.enabled = False
+            store.enabled = False
+        self.assertEqual([("PUT", "/workspaces/sf/datastores/sf.xml"),
+                          ("PUT", "/layers/roads.xml")], self.writes())
+        self.assertEqual({}, layer.dirty)
+
+    def testUnchangedValuesAreNotSaved(self):
+        with self.cat.session() as s:
+            layer = s.get_layer("roads")
+            layer.enabled = True
+            layer.default_style = "line"
+            store = s.get_store("sf", "sf")
+        self.assertEqual([], self.writes())
+
+    def testFailureStopsLaterRounds(self):
+        self.server.errors["/geoserver/rest/workspaces/sf/datastores/sf.xml"] = 500
+        def change():
+            with self.cat.session() as s:
+                s.get_layer("roads").enabled = False
+                s.get_store("sf", "sf").enabled = False
+        self.assertRaises(FailedRequestError, change)
+        self.assertEqual([("PUT", "/workspaces/sf/datastores/sf.xml")], self.writes())
+
+    def testCreatesNewObjects(self):
+        with self.cat.session() as s:
+            store = s.create_datastore("new", "sf")
+            store.connection_parameters.update(host="db")
+            s.create_layergroup("group", ["roads"], ["line"])
+        self.assertEqual([("POST", "/workspaces/sf/datastores?name=new"),
+                          ("POST", "/layergroups?name=group")], self.writes())
+        posted = self.server.bodies[0][2]
+        self.assertTrue("<name>new</name>" in posted and "db" in posted)
+        # created once, not again on the next flush
+        s.flush()
+        self.assertEqual(2, len(self.writes()))
+
+    def testChangesMadeInPlaceAreSaved(self):
+        store = self.cat.get_store("sf", "sf")
+        store.connection_parameters = {"host": "localhost"}
+        with self.cat.session() as s:
+            s.track(store)
+            store.connection_parameters["host"] = "db"
+        self.assertEqual([("PUT", "/workspaces/sf/datastores/sf.xml")], self.writes())
+
+    def testNothingIsSavedAfterAnError(self):
+        try:
+            with self.cat.session() as s:
+                s.get_layer("roads").enabled = False
+                raise KeyError()
+        except KeyError:
+            pass
+        self.assertEqual([], self.writes())
+
+if __name__ == "__main__":
+    unittest.main()
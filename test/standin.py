@@ -0,0 +1,179 @@
+"""
+A minimal stand-in for the GeoServer REST API, for tests that exercise
+gsconfig's HTTP handling without a running GeoServer.  It serves canned
+documents from a dict of paths, answers conditional GETs, and keeps a log
+of the requests it saw, the request bodies it received and the body bytes
+it sent.  With compress set it gzips responses for clients that accept it.
+Writes to the paths in its errors dict fail with the status given there,
+and the next n requests for a path in its outages dict, of any method, get
+a 503 with a Retry-After of 0 seconds, where n is the value given there.
+GETs of the paths in its delays dict are answered after the given seconds.
+"""
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+import hashlib
+import socket
+import sys
+import threading
+import time
+import zlib
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections.add(self.connection)
+
+    def finish(self):
+        self.server.connections.discard(self.connection)
+        BaseHTTPRequestHandler.finish(self)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status, body="", headers=()):
+        # record first, so the log is complete once the client has the body
+        self.server.record(self.command, self.path, status, len(body))
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _unavailable(self):
+        if not self.server.take_outage(self.path.split("?")[0]):
+            return False
+        if self.command in ("PUT", "POST"):
+            self._consume()
+        self._respond(503, "Restarting", [("Retry-After", "0")])
+        return True
+
+    def do_GET(self):
+        if self._unavailable():
+            return
+        path = self.path.split("?")[0]
+        if path in self.server.delays:
+            time.sleep(self.server.delays[path])
+        body = self.server.documents.get(path)
+        if body is None:
+            self._respond(404, "No such resource: " + path)
+            return
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self._respond(304, headers=[("ETag", etag)])
+            return
+        headers = [("ETag", etag), ("Content-Type", "application/xml")]
+        if self.server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+            headers.append(("Content-Encoding", "gzip"))
+        self._respond(200, body, headers)
+
+    def _consume(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(";")[0], 16)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                if size == 0:
+                    break
+            body = "".join(chunks)
+        else:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+        self.server.bodies.append((self.path, self.headers.get("Content-Encoding"), body))
+        return body
+
+    def _write(self, status):
+        error = self.server.errors.get(self.path.split("?")[0])
+        if error is not None:
+            self._respond(error, "Rejected by the stand-in")
+        else:
+            self._respond(status)
+
+    def do_PUT(self):
+        if self._unavailable():
+            return
+        self._consume()
+        # GeoServer answers file uploads with 201 Created
+        upload = "/file." in self.path or "/external." in self.path
+        self._write(201 if upload else 200)
+
+    def do_POST(self):
+        if self._unavailable():
+            return
+        self._consume()
+        self._write(201)
+
+    def do_DELETE(self):
+        if self._unavailable():
+            return
+        self._write(200)
+
+class StandInGeoServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, documents=None, compress=False):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), _Handler)
+        self.documents = dict(documents or {})
+        self.compress = compress
+        self.errors = dict()
+        self.outages = dict()
+        self.delays = dict()
+        self.requests = []
+        self.bodies = []
+        self.bytes_sent = 0
+        self.connections = set()
+        self.threads = []
+        self.stopped = False
+        self._lock = threading.Lock()
+
+    @property
+    def rest_url(self):
+        return "http://127.0.0.1:%d/geoserver/rest" % self.server_port
+
+    def process_request(self, request, client_address):
+        thread = threading.Thread(target=self.process_request_thread,
+            args=(request, client_address))
+        thread.daemon = True
+        self.threads.append(thread)
+        thread.start()
+
+    def handle_error(self, request, client_address):
+        # clients that time out hang up before they get their answer
+        if not self.stopped and not isinstance(sys.exc_info()[1], socket.error):
+            HTTPServer.handle_error(self, request, client_address)
+
+    def record(self, method, path, status, length):
+        with self._lock:
+            self.requests.append((method, path, status))
+            self.bytes_sent += length
+
+    def take_outage(self, path):
+        with self._lock:
+            remaining = self.outages.get(path, 0)
+            if remaining:
+                self.outages[path] = remaining - 1
+            return remaining > 0
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+        self.shutdown()
+        self.server_close()
+        # drop kept-alive client connections so their handler threads exit
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        for thread in self.threads:
+            thread.join(1)
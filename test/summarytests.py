@@ -0,0 +1,40 @@
+import unittest
+from geoserver.catalog import Catalog
+from geoserver.layer import Layer
+from geoserver.summary import LayerSummary, StyleSummary
+from test.standin import StandInGeoServer
+
+class SummaryTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            "/geoserver/rest/layers/states.xml":
+                "<layer><name>states</name><enabled>true</enabled></layer>"
+        }).start()
+        self.cat = Catalog(self.server.rest_url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testNameNeedsNoFullObject(self):
+        layer = LayerSummary(self.cat, "states")
+        self.assertEqual("states", layer.name)
+        self.assertEqual(None, layer._full)
+        self.assertFalse(hasattr(layer, "__dict__"))
+
+    def testOtherAttributesComeFromTheFullObject(self):
+        layer = LayerSummary(self.cat, "states")
+        self.assertEqual(True, layer.enabled)
+        self.assertTrue(isinstance(layer.full(), Layer))
+        self.assertTrue(layer.full() is layer.full())
+
+    def testWritesGoToTheFullObject(self):
+        layer = LayerSummary(self.cat, "states")
+        layer.enabled = False
+        layer.default_style = StyleSummary(self.cat, "point")
+        self.assertEqual({"enabled": False, "default_style": "point"}, layer.full().dirty)
+        self.cat.save(layer)
+        self.assertEqual(("PUT", "/geoserver/rest/layers/states.xml", 200),
+            self.server.requests[-1])
+
+if __name__ == "__main__":
+    unittest.main()
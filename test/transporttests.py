@@ -0,0 +1,488 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from geoserver.catalog import Catalog, FailedRequestError
+from geoserver.metrics import RequestListener, endpoint
+from geoserver.store import DataStore
+from geoserver.transport import CircuitBreaker, CircuitOpenError, DeadlineExceeded, \
+    HttpPool, RetryPolicy, within_deadline
+from geoserver.workspace import Workspace
+from test.standin import StandInGeoServer
+
+def _layers(count):
+    return "<layers>%s</layers>" % "".join(
+        "<layer><name>layer_%d</name></layer>" % i for i in range(count))
+
+class PoolTests(unittest.TestCase):
+    def setUp(self):
+        documents = dict(("/geoserver/rest/layers/layer_%d.xml" % i,
+            "<layer><name>layer_%d</name></layer>" % i) for i in range(16))
+        self.server = StandInGeoServer(documents).start()
+        self.layer_url = self.server.rest_url + "/layers/layer_%d.xml"
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testClientsAreKeptAlive(self):
+        pool = HttpPool(self.server.rest_url, "admin", "geoserver", size=4)
+        for i in range(5):
+            response, content = pool.request(self.layer_url % i)
+            self.assertEqual(200, response.status)
+        # one caller at a time needs one client, on one connection
+        self.assertEqual(1, len(self.server.threads))
+
+    def testCallersBeyondSizeWait(self):
+        for i in range(6):
+            self.server.delays["/geoserver/rest/layers/layer_%d.xml" % i] = 0.2
+        pool = HttpPool(self.server.rest_url, "admin", "geoserver", size=2)
+        statuses = []
+        def fetch(i):
+            statuses.append(pool.request(self.layer_url % i)[0].status)
+        threads = [threading.Thread(target=fetch, args=(i,)) for i in range(6)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([200] * 6, statuses)
+        self.assertEqual(2, len(self.server.threads))
+        # three rounds of two
+        self.assertTrue(time.time() - start >= 0.55)
+
+    def testConcurrentRequests(self):
+        pool = HttpPool(self.server.rest_url, "admin", "geoserver", size=4)
+        mismatches = []
+        def fetch(i):
+            for j in range(10):
+                response, content = pool.request(self.layer_url % i)
+                if content != "<layer><name>layer_%d</name></layer>" % i:
+                    mismatches.append((i, content))
+        threads = [threading.Thread(target=fetch, args=(i,)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], mismatches)
+        self.assertEqual(160, pool.stats()["requests"])
+        self.assertEqual(160, len(self.server.requests))
+        self.assertTrue(len(self.server.threads) <= 4, len(self.server.threads))
+
+class CompressionTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            "/geoserver/rest/layers.xml": _layers(500)
+        }, compress=True).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testCompressedResponseIsDecoded(self):
+        cat = Catalog(self.server.rest_url)
+        self.assertEqual(500, len(cat.get_layers()))
+        stats = cat.http.stats()
+        self.assertEqual(1, stats["requests"])
+        self.assertEqual(self.server.bytes_sent, stats["bytes_received"])
+        self.assertEqual(len(_layers(500)), stats["bytes_received_decoded"])
+        self.assertTrue(stats["bytes_received"] * 5 < stats["bytes_received_decoded"])
+
+    def testLargeBodiesAreCompressed(self):
+        pool = HttpPool(self.server.rest_url, "admin", "geoserver",
+            compress_requests=True, compress_threshold=1024)
+        small, large = "<layer/>", _layers(100)
+        pool.request(self.server.rest_url + "/layers/a.xml", "PUT", small)
+        pool.request(self.server.rest_url + "/layers/b.xml", "PUT", large)
+
+        (_, small_encoding, small_body), (_, large_encoding, large_body) = self.server.bodies
+        self.assertEqual((None, small), (small_encoding, small_body))
+        self.assertEqual("gzip", large_encoding)
+        self.assertEqual(large, zlib.decompress(large_body, 16 + zlib.MAX_WBITS))
+        stats = pool.stats()
+        self.assertEqual(len(small) + len(large), stats["bytes_sent_decoded"])
+        self.assertEqual(len(small) + len(large_body), stats["bytes_sent"])
+
+class StreamingTests(unittest.TestCase):
+    def setUp(self):
+        rest = "/geoserver/rest"
+        self.server = StandInGeoServer({
+            rest + "/layers.xml": _layers(2000),
+            rest + "/workspaces.xml":
+                "<workspaces><workspace><name>sf</name></workspace></workspaces>",
+            rest + "/workspaces/sf/datastores.xml":
+                "<dataStores><dataStore><name>sf</name></dataStore></dataStores>",
+            rest + "/workspaces/sf/coveragestores.xml":
+                "<coverageStores><coverageStore><name>sfdem</name></coverageStore></coverageStores>",
+            rest + "/workspaces/sf/datastores/sf/featuretypes.xml":
+                "<featureTypes><featureType><name>roads</name></featureType>"
+                "<featureType><name>streams</name></featureType></featureTypes>",
+            rest + "/workspaces/sf/coveragestores/sfdem/coverages.xml":
+                "<coverages><coverage><name>sfdem</name></coverage></coverages>"
+        }, compress=True).start()
+        self.cat = Catalog(self.server.rest_url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testStreamDecodesAsItReads(self):
+        with self.cat.http.stream(self.server.rest_url + "/layers.xml") as response:
+            self.assertEqual(200, response.status)
+            self.assertEqual("<layers><layer>", response.read(15))
+            self.assertEqual(_layers(2000)[15:], response.read())
+        stats = self.cat.http.stats()
+        self.assertEqual(self.server.bytes_sent, stats["bytes_received"])
+        self.assertEqual(len(_layers(2000)), stats["bytes_received_decoded"])
+
+    def testIterators(self):
+        names = [l.name for l in self.cat.iter_layers()]
+        self.assertEqual(["layer_%d" % i for i in range(2000)], names)
+        self.assertEqual(["sf"], [w.name for w in self.cat.iter_workspaces()])
+        resources = [(r.resource_type, r.store.name, r.name) for r in self.cat.iter_resources()]
+        self.assertEqual([("featureType", "sf", "roads"), ("featureType", "sf", "streams"),
+            ("coverage", "sfdem", "sfdem")], resources)
+
+    def testMissingListing(self):
+        self.assertRaises(FailedRequestError, list, self.cat.iter_styles())
+
+class _Unsized(object):
+    """A file-like object that can only be read, like a pipe."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, size):
+        block, self.data = self.data[:size], self.data[size:]
+        return block
+
+class UploadTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer().start()
+        self.cat = Catalog(self.server.rest_url)
+        self.payload = os.urandom(300000)
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, self.payload)
+        os.close(fd)
+
+    def tearDown(self):
+        self.server.stop()
+        os.unlink(self.path)
+
+    def testKnownLengthIsSentInBlocks(self):
+        reports = []
+        with open(self.path, "rb") as f:
+            response, content = self.cat.http.upload(self.server.rest_url + "/styles/a.sld",
+                "PUT", f, progress=lambda *args: reports.append(args))
+        self.assertEqual(200, response.status)
+        self.assertEqual(self.payload, self.server.bodies[0][2])
+        self.assertEqual([65536, 131072, 196608, 262144, 300000], [r[0] for r in reports])
+        self.assertTrue(all(total == 300000 and rate >= 0 for (sent, total, rate) in reports))
+
+    def testUnknownLengthIsChunked(self):
+        response, content = self.cat.http.upload(self.server.rest_url + "/styles/a.sld",
+            "PUT", _Unsized(self.payload))
+        self.assertEqual(self.payload, self.server.bodies[0][2])
+        stats = self.cat.http.stats()
+        self.assertEqual(300000, stats["bytes_sent_decoded"])
+        self.assertTrue(stats["bytes_sent"] > 300000)
+
+    def testAddDataToStoreStreams(self):
+        reports = []
+        store = DataStore(self.cat, Workspace(self.cat, "sf"), "sf")
+        self.cat.add_data_to_store(store, "roads", self.path,
+            progress=lambda *args: reports.append(args))
+        path, encoding, body = self.server.bodies[0]
+        self.assertEqual("/geoserver/rest/workspaces/sf/datastores/sf/file.shp", path)
+        self.assertEqual(self.payload, body)
+        self.assertEqual(300000, reports[-1][0])
+
+class ExternalUploadTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer().start()
+        self.cat = Catalog(self.server.rest_url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def upload(self):
+        path, encoding, body = self.server.bodies[-1]
+        return path[len("/geoserver/rest"):], body
+
+    def testShapefileIsPublishedByPath(self):
+        self.cat.create_featurestore("roads", {"shp": "/data/sf/roads.shp", "dbf": "/data/sf/roads.dbf"},
+            workspace="sf", overwrite=True, external=True)
+        self.assertEqual(("/workspaces/sf/datastores/roads/external.shp",
+            "file:/data/sf/roads.shp"), self.upload())
+
+    def testAddDataToStoreByPath(self):
+        store = DataStore(self.cat, Workspace(self.cat, "sf"), "sf")
+        self.cat.add_data_to_store(store, "roads", "/data/sf/roads.shp", external=True)
+        self.assertEqual(("/workspaces/sf/datastores/sf/external.shp",
+            "file:/data/sf/roads.shp"), self.upload())
+
+    def testRastersArePublishedByPath(self):
+        self.cat.create_coveragestore("dem", "/data/sf/big dem.tif",
+            workspace="sf", overwrite=True, external=True)
+        self.assertEqual(("/workspaces/sf/coveragestores/dem/external.geotiff",
+            "file:/data/sf/big%20dem.tif"), self.upload())
+        self.cat.create_coveragestore("ortho", "/data/sf/ortho/",
+            workspace="sf", overwrite=True, external=True)
+        self.assertEqual(("/workspaces/sf/coveragestores/ortho/external.imagemosaic",
+            "file:/data/sf/ortho/"), self.upload())
+        self.cat.create_coveragestore("scan", {"png": "/data/sf/scan.png", "tfw": "/data/sf/scan.tfw"},
+            workspace="sf", overwrite=True, external=True)
+        self.assertEqual(("/workspaces/sf/coveragestores/scan/external.worldimage",
+            "file:/data/sf/scan.png"), self.upload())
+
+class RetryTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            "/geoserver/rest/layers.xml": _layers(3)
+        }).start()
+        self.waits = []
+        self.retry = RetryPolicy(retries=2, backoff=0.01)
+        self.retry.sleep = self.waits.append
+        self.cat = Catalog(self.server.rest_url, retry=self.retry)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testTransientFailuresAreRetried(self):
+        self.server.outages["/geoserver/rest/layers.xml"] = 2
+        self.assertEqual(3, len(self.cat.get_layers()))
+        self.assertEqual([503, 503, 200], [status for (_, _, status) in self.server.requests])
+        # the stand-in's Retry-After: 0 wins over the backoff
+        self.assertEqual([0.0, 0.0], self.waits)
+        self.assertEqual(2, self.cat.http.stats()["retries"])
+
+    def testRetriesRunOut(self):
+        self.server.outages["/geoserver/rest/layers.xml"] = 3
+        self.assertRaises(FailedRequestError, self.cat.get_layers)
+        stats = self.cat.http.stats()
+        self.assertEqual(2, stats["retries"])
+        self.assertEqual(1, stats["retries_exhausted"])
+
+    def testPostIsNotRetried(self):
+        self.server.outages["/geoserver/rest/workspaces"] = 1
+        response, content = self.cat.http.request(self.server.rest_url + "/workspaces",
+            "POST", "<workspace><name>sf</name></workspace>")
+        self.assertEqual(503, response.status)
+        self.assertEqual(1, len(self.server.requests))
+
+    def testUploadStartsOverOnRetry(self):
+        self.server.outages["/geoserver/rest/styles/a.sld"] = 1
+        payload = os.urandom(100000)
+        fd, path = tempfile.mkstemp()
+        os.write(fd, payload)
+        os.close(fd)
+        try:
+            with open(path, "rb") as f:
+                response, content = self.cat.http.upload(
+                    self.server.rest_url + "/styles/a.sld", "PUT", f)
+        finally:
+            os.unlink(path)
+        self.assertEqual(200, response.status)
+        self.assertEqual(payload, self.server.bodies[-1][2])
+
+    def testDataUploadsAreOnlyRetriedWhenOverwriting(self):
+        store = self.server.rest_url + "/workspaces/sf/datastores/roads/file.shp"
+        self.server.outages["/geoserver/rest/workspaces/sf/datastores/roads/file.shp"] = 1
+        response, content = self.cat.http.upload(store, "PUT", "zip")
+        self.assertEqual(503, response.status)
+        self.server.outages["/geoserver/rest/workspaces/sf/datastores/roads/file.shp"] = 1
+        response, content = self.cat.http.upload(store + "?update=overwrite", "PUT", "zip")
+        self.assertEqual(201, response.status)
+        self.assertEqual([503, 503, 201], [status for (_, _, status) in self.server.requests])
+
+    def testBackoffGrowsWithJitter(self):
+        policy = RetryPolicy(backoff=1, max_backoff=5)
+        for attempt, ceiling in [(0, 1), (1, 2), (2, 4), (5, 5)]:
+            delays = [policy.delay(attempt) for i in range(50)]
+            self.assertTrue(all(0 <= d <= ceiling for d in delays))
+            self.assertTrue(len(set(delays)) > 1)
+        self.assertEqual(5, policy.delay(0, {"retry-after": "120"}))
+        self.assertEqual(3, policy.delay(0, {"retry-after": "3"}))
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            "/geoserver/rest/layers.xml": _layers(3)
+        }).start()
+        self.breaker = CircuitBreaker(failures=2, reset_after=60)
+        self.pool = HttpPool(self.server.rest_url, "admin", "geoserver",
+            circuit_breaker=self.breaker)
+        self.url = self.server.rest_url + "/layers.xml"
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testOpensAfterConsecutiveFailures(self):
+        self.server.outages["/geoserver/rest/layers.xml"] = 2
+        self.assertEqual(503, self.pool.request(self.url)[0].status)
+        self.assertEqual(503, self.pool.request(self.url)[0].status)
+        self.assertRaises(CircuitOpenError, self.pool.request, self.url)
+        self.assertEqual(2, len(self.server.requests))
+        stats = self.pool.stats()
+        self.assertEqual(1, stats["circuit_opened"])
+        self.assertEqual(1, stats["circuit_rejected"])
+
+    def testTrialRequestClosesIt(self):
+        self.server.outages["/geoserver/rest/layers.xml"] = 2
+        self.pool.request(self.url)
+        self.pool.request(self.url)
+        self.breaker.reset_after = 0
+        self.assertEqual(200, self.pool.request(self.url)[0].status)
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+
+    def testAbandonedTrialDoesNotWedgeTheBreaker(self):
+        self.server.outages["/geoserver/rest/layers.xml"] = 2
+        self.pool.request(self.url)
+        self.pool.request(self.url)
+        self.breaker.reset_after = 0
+        with within_deadline(0):
+            self.assertRaises(DeadlineExceeded, self.pool.request, self.url)
+        self.assertEqual(200, self.pool.request(self.url)[0].status)
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+
+    def testSuccessResetsTheCount(self):
+        self.server.outages["/geoserver/rest/layers.xml"] = 1
+        self.pool.request(self.url)
+        self.pool.request(self.url)
+        self.server.outages["/geoserver/rest/layers.xml"] = 1
+        self.pool.request(self.url)
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+
+class DeadlineTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            "/geoserver/rest/layers.xml": _layers(3),
+            "/geoserver/rest/workspaces.xml": "<workspaces/>"
+        }).start()
+        self.server.delays["/geoserver/rest/layers.xml"] = 0.5
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testReadTimeout(self):
+        cat = Catalog(self.server.rest_url, timeout=(5, 0.1))
+        self.assertRaises(socket.timeout, cat.get_layers)
+        # the pooled connection doesn't keep the short timeout of the
+        # failed request
+        self.assertEqual([], cat.get_workspaces())
+
+    def testDeadlineCutsRequestShort(self):
+        cat = Catalog(self.server.rest_url)
+        start = time.time()
+        self.assertRaises(DeadlineExceeded, cat.get_layers, deadline=0.1)
+        self.assertTrue(time.time() - start < 0.4)
+        self.assertEqual(1, cat.http.stats()["deadlines_exceeded"])
+        self.assertEqual(3, len(cat.get_layers()))
+
+    def testExpiredDeadlineSendsNothing(self):
+        cat = Catalog(self.server.rest_url)
+        with within_deadline(0):
+            self.assertRaises(DeadlineExceeded, cat.get_workspaces)
+        self.assertEqual([], self.server.requests)
+        self.assertEqual(1, cat.stats()["transport"]["deadlines_exceeded"])
+
+    def testDeadlineReachesWorkers(self):
+        cat = Catalog(self.server.rest_url, workers=4)
+        layers_url = self.server.rest_url + "/layers.xml"
+        start = time.time()
+        with within_deadline(0.1):
+            self.assertRaises(DeadlineExceeded, cat._map,
+                lambda i: cat.http.request(layers_url), range(4))
+        self.assertTrue(time.time() - start < 0.4)
+
+    def testNoRetryPastTheDeadline(self):
+        self.server.outages["/geoserver/rest/workspaces.xml"] = 1
+        retry = RetryPolicy(backoff=10, max_backoff=10)
+        retry.delay = lambda attempt, response=None: 10
+        cat = Catalog(self.server.rest_url, retry=retry)
+        self.assertRaises(DeadlineExceeded, cat.get_workspaces, deadline=1)
+        self.assertEqual(1, len(self.server.requests))
+
+class _Recorder(RequestListener):
+    def __init__(self):
+        self.events = []
+
+    def request_started(self, event):
+        self.events.append(("started", event))
+
+    def request_finished(self, event):
+        self.events.append(("finished", event))
+
+class _Broken(RequestListener):
+    def request_finished(self, event):
+        raise RuntimeError("listener bug")
+
+class InstrumentationTests(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInGeoServer({
+            "/geoserver/rest/layers.xml": _layers(3),
+            "/geoserver/rest/layers/layer_0.xml": "<layer><name>layer_0</name></layer>"
+        }).start()
+        self.recorder = _Recorder()
+        self.cat = Catalog(self.server.rest_url, listeners=[self.recorder, _Broken()])
+
+    def tearDown(self):
+        self.server.stop()
+
+    def testEndpointTemplates(self):
+        rest = "http://localhost:8080/geoserver/rest"
+        for path, template in [
+                ("/layers.xml", "/layers"),
+                ("/layers/sf:roads.xml", "/layers/{layer}"),
+                ("/workspaces/sf/datastores/roads/featuretypes/roads.json?quietOnNotFound=true",
+                    "/workspaces/{workspace}/datastores/{store}/featuretypes/{resource}"),
+                ("/workspaces/sf/coveragestores/dem/file.geotiff",
+                    "/workspaces/{workspace}/coveragestores/{store}/file.geotiff"),
+                ("/about/version.xml", "/about/version")]:
+            self.assertEqual(template, endpoint(rest, rest + path))
+
+    def testEventsPerRequest(self):
+        self.cat.get_layers()
+        self.cat.get_layer("layer_0")
+        self.assertEqual(["started", "finished"] * 2, [kind for (kind, _) in self.recorder.events])
+        finished = [event for (kind, event) in self.recorder.events if kind == "finished"]
+        self.assertEqual([("GET", "/layers", 200), ("GET", "/layers/{layer}", 200)],
+            [(e.method, e.endpoint, e.status) for e in finished])
+        self.assertEqual(len(_layers(3)), finished[0].bytes_received)
+        self.assertTrue(all(e.duration >= 0 and e.error is None for e in finished))
+
+    def testStreamedBodiesOnlyCountInThePool(self):
+        names = []
+        for layer in self.cat.iter_layers():
+            names.append(layer.name)
+            self.cat.get_xml(self.server.rest_url + "/layers/layer_0.xml")
+        self.assertEqual(["layer_0", "layer_1", "layer_2"], names)
+        stats = self.cat.stats()
+        self.assertEqual(0, stats["endpoints"]["GET /layers"]["bytes_received"])
+        self.assertEqual(len("<layer><name>layer_0</name></layer>"),
+            stats["endpoints"]["GET /layers/{layer}"]["bytes_received"])
+        self.assertEqual(self.server.bytes_sent, stats["transport"]["bytes_received"])
+
+    def testFailuresAreReported(self):
+        self.server.stop()
+        self.assertRaises(socket.error, self.cat.get_layers)
+        kind, event = self.recorder.events[-1]
+        self.assertEqual(("finished", None), (kind, event.status))
+        self.assertTrue(isinstance(event.error, socket.error))
+
+    def testCatalogStats(self):
+        self.cat.get_layers()
+        self.cat.get_layers()
+        self.cat.get_layer("missing")
+        stats = self.cat.stats()
+        self.assertEqual(2, stats["transport"]["requests"])
+        self.assertEqual(1, stats["cache"]["hits"])
+        layers = stats["endpoints"]["GET /layers"]
+        self.assertEqual(1, layers["requests"])
+        self.assertEqual(0, layers["errors"])
+        self.assertEqual(1, sum(count for (bound, count) in layers["latency"]))
+        self.assertEqual(None, layers["latency"][-1][0])
+        self.assertEqual(1, stats["endpoints"]["GET /layers/{layer}"]["errors"])
+
+if __name__ == "__main__":
+    unittest.main()